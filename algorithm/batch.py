@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-17 23:10:26
+# @Author  : HeLiang (helianghit@foxmail.com)
+# @Link    : https://github.com/HeLiangHIT
+r'''
+批量生成和求解迷宫: 任务分发到多进程(ProcessPoolExecutor)，每个任务使用独立的随机种子，结果可复现，
+地图以紧凑的字节网格经 multiprocessing.shared_memory 传回，而不是 pickle 整个 Map，结果按完成顺序逐个产出，使用示例如下:
+>>> results = sorted(generate_many(4, (9, 9), method = "primg", seed = 7, workers = 2))
+>>> [(k, m.size, len(path) > 0) for k, m, path in results]
+[(0, (9, 9), True), (1, (9, 9), True), (2, (9, 9), True), (3, (9, 9), True)]
+>>> random.seed(8); primg((9, 9), [(0, 0),], [(8, 8),]).diff(results[1][1]) # 与相同种子的单进程生成结果一致
+[]
+>>> [(k, len(path)) for k, path in sorted(solve_many([results[0][1], results[1][1]], workers = 2))] == [(k, len(path)) for k, _, path in results[:2]]
+True
+'''
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory, resource_tracker
+from .map import Map, Grid
+from .search import Solver
+from .generate import dfsg, primg, kruskalg, ellerg, wilsong, divisiong, binarytreeg, sidewinderg
+
+
+GENERATORS = {
+    "dfsg": dfsg,
+    "primg": primg,
+    "kruskalg": kruskalg,
+    "ellerg": ellerg,
+    "wilsong": wilsong,
+    "divisiong": divisiong, # 以下需要 numpy
+    "binarytreeg": binarytreeg,
+    "sidewinderg": sidewinderg,
+}
+
+
+def _export(raw):
+    '''把网格字节写入新的共享内存，返回共享内存对象，使用方负责 unlink'''
+    shm = shared_memory.SharedMemory(create = True, size = max(len(raw), 1))
+    shm.buf[:len(raw)] = raw
+    return shm
+
+
+def _import(name, size, release = True):
+    '''从共享内存读出网格(size 为 None 时不读取)，release 为 True 时随后释放共享内存'''
+    shm = shared_memory.SharedMemory(name = name)
+    try:
+        return Grid(size, buf = bytearray(shm.buf[:size[0] * size[1]])) if size else None
+    finally:
+        shm.close()
+        if release:
+            shm.unlink()
+
+
+def _as_map(grid):
+    m = Map.__new__(Map)
+    m._size, m._data = grid.size, grid
+    return m
+
+
+def _ends(size, starts, ends):
+    return list(starts or [(0, 0), ]), list(ends or [(size[0] - 1, size[1] - 1), ])
+
+
+def _generate_job(k, method, size, starts, ends, seed, solve):
+    # 子进程: 按种子生成迷宫，可选求解起点到终点的最短路
+    random.seed(seed)
+    m = GENERATORS[method](size, starts, ends)
+    path = Solver(m.data).solve(starts[0], ends[0]) if solve else None
+    shm = _export(m.data.tobytes())
+    shm.close() # 共享内存由父进程读取后 unlink
+    return k, shm.name, path
+
+
+def _solve_job(k, name, size, starts, ends):
+    # 子进程: 读取共享内存中的地图并求解，共享内存由父进程释放
+    grid = _import(name, size, release = False)
+    return k, Solver(grid).solve(starts[0], ends[0])
+
+
+def _pool(workers):
+    # POSIX 下先启动 resource_tracker，子进程与父进程共用同一个，共享内存由父进程统一登记和回收，父进程异常退出时也不会泄漏
+    # resource_tracker 是 multiprocessing 的内部接口且只在 POSIX 下使用；Windows 的共享内存在最后一个句柄关闭时由系统回收，不需要它
+    if os.name == "posix":
+        resource_tracker.ensure_running()
+    return ProcessPoolExecutor(max_workers = workers)
+
+
+def generate_many(count, size, method = "primg", seed = 0, starts = None, ends = None, solve = True, workers = None):
+    '''多进程生成 count 个迷宫，第 k 个使用种子 seed + k，按完成顺序逐个产出 (k, Map, 最短路)
+    starts/ends 默认为左上角和右下角；solve 为 False 时最短路为 None；workers 默认为 CPU 核数
+    '''
+    if method not in GENERATORS:
+        print(f"unknown generate method: {method}")
+        return
+    size = tuple(size)
+    starts, ends = _ends(size, starts, ends)
+    with _pool(workers) as pool:
+        futures = [pool.submit(_generate_job, k, method, size, starts, ends, seed + k, solve) for k in range(count)]
+        pending = set(futures)
+        try:
+            for f in as_completed(futures):
+                pending.discard(f)
+                k, name, path = f.result()
+                yield k, _as_map(_import(name, size)), path
+        finally:
+            pool.shutdown(cancel_futures = True) # 提前结束时取消未开始的任务
+            for f in pending: # 已完成但未读取的结果直接释放共享内存
+                if not f.cancelled() and f.exception() is None:
+                    _import(f.result()[1], None)
+
+
+def solve_many(maps, starts = None, ends = None, workers = None):
+    '''多进程求解多个迷宫起点到终点的最短路，按完成顺序逐个产出 (序号, 最短路)，不可达时为空列表
+    starts/ends 默认取各地图自身的起止点；地图经共享内存传给子进程
+    '''
+    shms = []
+    with _pool(workers) as pool:
+        try:
+            futures = []
+            for k, m in enumerate(maps):
+                srcs, dsts = list(starts or m.start), list(ends or m.end)
+                if not srcs or not dsts:
+                    print(f"map {k} has no start or end point")
+                    continue
+                shms.append(_export(m.data.tobytes()))
+                futures.append(pool.submit(_solve_job, k, shms[-1].name, m.size, srcs, dsts))
+            for f in as_completed(futures):
+                yield f.result()
+        finally:
+            pool.shutdown(cancel_futures = True) # 子进程都结束后才能释放共享内存
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()  # verbose=True shows the output
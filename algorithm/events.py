@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-17 23:11:59
+# @Author  : HeLiang (helianghit@foxmail.com)
+# @Link    : https://github.com/HeLiangHIT
+r'''
+分步执行与增量事件: 生成和搜索算法都提供 xxx_steps 分步版本，每一步产出一次地图网格，结束时的返回值即算法的结果，
+drive 把它一次运行到结束，pump 则按时间预算分段推进，便于界面在定时器中运行并随时取消；
+callback 每一步都传入整个网格，DeltaStream 把它转换为只包含修改格子的批量事件，
+视图直接应用修改即可，开销与修改量成正比而不是格子数乘以步数，使用示例如下:
+>>> from algorithm.search import bfs, bfs_steps; from algorithm.generate import dfsg
+>>> steps = bfs_steps(Map((20, 20)).data, [(0, 0),], [(19, 19),], max_steps = 10 ** 6)
+>>> pump(steps, limit = 10) # 推进 10 步，未结束
+(False, None)
+>>> done, paths = pump(steps, budget = 10); print(done, len(paths[0]))
+True 39
+>>> batches = []
+>>> with DeltaStream(batches.append, every = 2, on_reset = lambda g: batches.append("reset")) as stream:
+...     paths = bfs(Map((2, 3)).data, [(0, 0),], [(1, 2),], callback = stream)
+>>> for batch in batches: print(batch) # 首帧整体刷新，之后每两步合并为一批，同一格子只保留最后的值
+reset
+[(1, 0, <Point.Visited: 5>), (0, 1, <Point.Visited: 5>), (1, 1, <Point.NxtVisit: 6>)]
+[(0, 2, <Point.Visited: 5>), (1, 1, <Point.Visited: 5>), (1, 2, <Point.NxtVisit: 6>)]
+[(1, 2, <Point.Visited: 5>)]
+>>> with DeltaStream(batches.append) as stream: # 未设置 on_reset 时首帧为整个网格
+...     m = dfsg((3, 3), [(0, 0),], [(2, 2),], callback = stream)
+>>> print(len(batches[4]), m.data.changes()) # 结束后不再记录返回地图的修改
+9 []
+'''
+import time
+from .map import Map, Grid
+
+
+def drive(steps, callback = None):
+    '''把分步算法运行到结束，每产出一步调用一次 callback，返回算法的结果'''
+    try:
+        while True:
+            view = next(steps)
+            if callback is not None:
+                callback(view)
+    except StopIteration as e:
+        return e.value
+
+
+def pump(steps, budget = 0.004, limit = None, callback = None):
+    '''推进分步算法，直到用完 budget 秒或推进了 limit 步(为 None 时不限制)，用于在定时器或每帧的任务中分段运行
+    返回 (是否已结束, 结束时为算法的结果否则为 None)；每产出一步调用一次 callback
+    '''
+    deadline, count = time.perf_counter() + budget, 0
+    try:
+        while True:
+            view = next(steps)
+            if callback is not None:
+                callback(view)
+            count += 1
+            if (limit is not None and count >= limit) or time.perf_counter() >= deadline:
+                return False, None
+    except StopIteration as e:
+        return True, e.value
+
+
+class DeltaStream(object):
+    '''把 callback(整个网格) 转换为增量事件 sink([(m, n, 新值), ...])，可直接作为各算法的 callback 传入
+    首次见到某个网格时调用 on_reset(网格)，未设置时把整个网格作为一批修改发出；之后每 every 次回调合并发出一批修改，
+    every 为 None 时只在调用 flush 时发出(如配合 pump 每帧发出一批)
+    二维列表不支持记录修改，每次回调都当作首次处理；算法结束后需 close(或使用 with)发出剩余的修改并停止记录
+    '''
+    def __init__(self, sink, every = 1, on_reset = None):
+        self._sink, self._on_reset = sink, on_reset
+        self._every = None if every is None else max(int(every), 1)
+        self._grid, self._steps = None, 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __call__(self, grid):
+        if grid is self._grid:
+            self._steps += 1
+            if self._every is not None and self._steps >= self._every:
+                self.flush()
+            return
+        self.close() # 算法换了网格，先发出旧网格剩余的修改
+        if isinstance(grid, Grid):
+            self._grid = grid
+            grid.track()
+        if self._on_reset is not None:
+            self._on_reset(grid)
+        else:
+            self._sink([(m, n, p) for m, row in enumerate(grid) for n, p in enumerate(row)])
+
+    def flush(self):
+        '''发出尚未发出的修改'''
+        self._steps = 0
+        changes = self._grid.changes() if self._grid is not None else []
+        if changes:
+            self._sink(changes)
+
+    def close(self):
+        '''发出剩余的修改并停止记录当前网格'''
+        self.flush()
+        if self._grid is not None:
+            self._grid.track(False)
+            self._grid = None
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()  # verbose=True shows the output
@@ -7,7 +7,9 @@
 #            还有递归分割等很多迷宮生成算法
 # 此处r主要是为了支持在 doctest 命令中使用 \n
 r'''
-迷宫生成，提供dfsg(深度优先)和primg(随机广度)两种方法，入参相同，使用示例如下:
+迷宫生成，提供dfsg(深度优先)、primg(随机广度)、kruskalg(随机Kruskal)、ellerg(逐行Eller)和wilsong(均匀生成树)五种方法，
+以及基于 numpy 整体数组运算的 divisiong(递归分割)、binarytreeg(二叉树)和sidewinderg(Sidewinder)三种方法，入参相同，
+各有分步执行的 xxx_steps 版本(见 events 模块)，使用示例如下:
 >>> callback = lambda m: print('\n'.join(["-----", ] + [' '.join([p.name[0] for p in row]) for row in m]))
 >>> m = dfsg((3, 3), [(0, 0),], [(2, 2),], callback=callback) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
 -----
@@ -39,6 +41,41 @@ C...
 S...
 ...
 ...E
+>>> m = kruskalg((3, 3), [(0, 0),], [(2, 2),], callback=callback) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+-----
+C W C
+W W W
+C W C
+...
+>>> print(m) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+3X3:
+S...
+...
+...E
+>>> m = ellerg((3, 3), [(0, 0),], [(2, 2),], callback=callback) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+-----
+C...
+...
+>>> print(m) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+3X3:
+S...
+...
+...E
+>>> m = wilsong((5, 5), [(0, 0),], [(4, 4),], callback=callback) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+-----
+C W W W W
+...
+>>> print(m) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+5X5:
+S...
+...
+...E
+>>> print(wilsong((61, 61), [(0, 0),], [(60, 60),], hybrid=True).count(Point.Chan) + 2) # 完美迷宫: 31*31个单元 + 31*31-1面打通的墙
+1921
+>>> with MapWriter("./eller.map", 41, [(0, 0),], [(998, 40),]) as w: # 流式写入超大迷宫，内存只与宽度相关
+...     for row in eller_rows(41, 999, [(0, 0),], [(998, 40),]): w.write(row)
+>>> m = Map.load("./eller.map"); print(m.size, m.start, m.end); os.remove("./eller.map")
+(999, 41) [(0, 0)] [(998, 40)]
 >>> m = primg((60, 60), [(0, 0),], [(45, 51),]) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
 >>> print(m) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
 60X60:
@@ -46,12 +83,29 @@ S...
 ...
 W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W W
 '''
-import sys
+import os
 import copy
 import random
 import traceback
+from array import array
 from functools import reduce
-from .map import Point, Map
+from .map import Point, Map, MapWriter
+from .events import drive
+try:
+    import numpy as np # 可选依赖，仅 numpy 向量化的生成算法需要
+except ImportError:
+    np = None
+
+# numpy 生成算法的示例，未安装 numpy 时跳过
+__test__ = {} if np is None else {"numpy": r'''
+>>> m = sidewinderg((5, 5), [(0, 0),], [(4, 4),]); print(m) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+5X5:
+S C C C C
+...
+...E
+>>> [g((301, 301), [(0, 0),], [(300, 300),]).count(Point.Chan) + 2 for g in (divisiong, binarytreeg, sidewinderg)] # 都是完美迷宫
+[45601, 45601, 45601]
+'''}
 
 
 def _valid_check(size, starts, ends):
@@ -71,7 +125,7 @@ def _valid_check(size, starts, ends):
 def _valid_neighbour(m, cur, value = Point.Wall):
     size = m.size
     udlr = [(cur[0] - 1, cur[1]), (cur[0] + 1, cur[1]), (cur[0], cur[1] - 1), (cur[0], cur[1] + 1),]
-    unvisited_nb = reduce(lambda x, y: x + y, [0 <= q[0] < size[0] and 0 <= q[1] < size[1] and m.data[q[0]][q[1]] == value for q in udlr])
+    unvisited_nb = reduce(lambda x, y: x + y, [0 <= q[0] < size[0] and 0 <= q[1] < size[1] and m.data.get(q[0], q[1]) == value for q in udlr])
     return unvisited_nb
 
 
@@ -81,10 +135,48 @@ def _connect_points(m, targets):
             udlr = [(p[0] - 1, p[1]), (p[0] + 1, p[1]), (p[0], p[1] - 1), (p[0], p[1] + 1),]
             ava_nb = filter(lambda x: _valid_neighbour(m, x, Point.Chan) >= 1, udlr)
             link = random.choice(list(ava_nb))
-            m.data[link[0]][link[1]] = Point.Chan
+            m.data.set(link[0], link[1], Point.Chan)
+    return m
+
+
+def _carve_buffer(m, visible):
+    '''生成算法读写的一维格子存储及挖通函数
+    不产出中间结果时直接读写地图的底层存储(结束后需 reindex)；否则外部可能持有地图快照，因此读写独立的镜像，并经 Grid 同步写入地图
+    '''
+    grid, width = m.data, m.size[1]
+    if not visible:
+        cells = grid.buf
+        def carve(i):
+            cells[i] = Point.Chan
+    else:
+        cells = bytearray(grid.tobytes())
+        def carve(i):
+            cells[i] = Point.Chan
+            grid.set(i // width, i % width, Point.Chan)
+    return cells, carve
+
+
+def _finish(m, starts, ends, visible, targets = None):
+    '''生成结束后的通用处理: 更新索引、把 targets(默认为全部起止点，奇数坐标的不在单元上)链接到最近的可行点并标记起止点'''
+    if not visible:
+        m.data.reindex()
+    m = _connect_points(m, starts + ends if targets is None else targets)
+
+    for p in starts:
+        m.data.set(p[0], p[1], Point.Start)
+    for p in ends:
+        m.data.set(p[0], p[1], Point.End)
     return m
 
 
+def _wall_neighbour(cells, size, i):
+    '''一维下标 i 的上下左右是否存在墙，等价于 _valid_neighbour(m, p) >= 1'''
+    height, width = size
+    row, col = divmod(i, width)
+    return ((row > 0 and cells[i - width] == Point.Wall) or (row < height - 1 and cells[i + width] == Point.Wall)
+            or (col > 0 and cells[i - 1] == Point.Wall) or (col < width - 1 and cells[i + 1] == Point.Wall))
+
+
 def dfsg(size, starts, ends, callback = None):
     '''深度优先迷宫生成算法:
     算法流程:
@@ -99,45 +191,61 @@ def dfsg(size, starts, ends, callback = None):
             1.栈顶的迷宫单元出栈
             2.令其成为当前迷宫单元
     这种算法生成的迷宫会有比较明显的主路
+    实现上使用显式栈代替递归，每帧仅保存当前格子、四个方向的随机排列和下一个待尝试的方向，不受递归深度限制
     '''
+    return drive(dfsg_steps(size, starts, ends, visible = callback is not None), callback)
+
+
+def dfsg_steps(size, starts, ends, visible = True):
+    '''dfsg 的分步版本: 每一步产出一次地图网格，结束时的返回值(StopIteration.value)为生成的地图；visible 为 False 时不产出，直接运行到结束'''
     if not _valid_check(size, starts, ends):
         return []
-    pre_stack_limit = sys.getrecursionlimit()
-    sys.setrecursionlimit(10000)
+    height, width = size
     m = Map(size, default = Point.Wall)
-    visited_flag = [[False for _ in range(size[1])] for _ in range(size[0])]
-
-    def dfs(cur):
-        visited_flag[cur[0]][cur[1]] = True
-        m.data[cur[0]][cur[1]] = Point.Chan
-
-        if callback is not None:
-            callback(m.data)
+    cells, carve = _carve_buffer(m, visible)
+    visited_flag = bytearray(height * width)
+    end_ids = {p[0] * width + p[1] for p in ends}
+    offsets = ((-2, 0), (2, 0), (0, -2), (0, 2)) # 上下左右
+    stack_cell, stack_order, stack_next = array('i'), bytearray(), bytearray() # 显式栈: 当前点、方向排列、下一个方向
 
-        if cur in ends: # 走到终点就不用打通终点周围的墙了
+    def visit(cur):
+        visited_flag[cur] = 1
+        carve(cur)
+        if cur in end_ids: # 走到终点就不用打通终点周围的墙了
             return
-        udlr = [(cur[0] - 2, cur[1]), (cur[0] + 2, cur[1]), (cur[0], cur[1] - 2), (cur[0], cur[1] + 2),]
-        random.shuffle(udlr)
-        for p in udlr:
-            if 0 <= p[0] < size[0] and 0 <= p[1] < size[1] and not visited_flag[p[0]][p[1]] and _valid_neighbour(m, p) >= 1:
-                if cur[0] == p[0]:
-                    m.data[p[0]][min(cur[1], p[1]) + 1] = Point.Chan
-                    visited_flag[p[0]][min(cur[1], p[1]) + 1] = True
-                else:
-                    m.data[min(cur[0], p[0]) + 1][p[1]] = Point.Chan
-                    visited_flag[min(cur[0], p[0]) + 1][p[1]] = True
-                dfs(p)
-
-    dfs(starts[0]) # DFS 只需要一条线走到黑
-    # start[0] 和 starts[1:]/end 之间差非偶数的情况下无法联通，需要链接终点到最近的可行点
-    m = _connect_points(m, starts[1:] + ends)
+        order = [0, 1, 2, 3]
+        random.shuffle(order) # 与递归版本消耗相同的随机数，同一种子生成相同迷宫
+        stack_cell.append(cur)
+        stack_order.append(order[0] | order[1] << 2 | order[2] << 4 | order[3] << 6)
+        stack_next.append(0)
 
-    for p in starts:
-        m.data[p[0]][p[1]] = Point.Start
-    for p in ends:
-        m.data[p[0]][p[1]] = Point.End
-    sys.setrecursionlimit(pre_stack_limit)
-    return m
+    visit(starts[0][0] * width + starts[0][1]) # DFS 只需要一条线走到黑
+    if visible:
+        yield m.data
+    while stack_cell:
+        k = stack_next[-1]
+        if k == 4:
+            stack_cell.pop()
+            stack_order.pop()
+            stack_next.pop()
+            continue
+        stack_next[-1] = k + 1
+        cur = stack_cell[-1]
+        dr, dc = offsets[stack_order[-1] >> (2 * k) & 3]
+        row, col = divmod(cur, width)
+        row, col = row + dr, col + dc
+        if not (0 <= row < height and 0 <= col < width):
+            continue
+        p = row * width + col
+        if not visited_flag[p] and _wall_neighbour(cells, size, p):
+            mid = (cur + p) // 2 # 两点之间的墙
+            carve(mid)
+            visited_flag[mid] = 1
+            visit(p)
+            if visible:
+                yield m.data
+    # start[0] 和 starts[1:]/end 之间差非偶数的情况下无法联通，需要链接终点到最近的可行点
+    return _finish(m, starts, ends, visible, starts[1:] + ends)
 
 
 def primg(size, starts, ends, callback = None):
@@ -151,43 +259,58 @@ def primg(size, starts, ends, callback = None):
         2.如果墙两面的单元格都已经被访问过，那就从列表里移除这面墙
     改进: 如果把墙放到列表中，比较复杂，维基里面提到了改进策略。可以维护一个迷宫单元格的列表，而不是边的列表。在这个迷宫单元格列表里面存放了未访问的单元格，我们在单元格列表中随机挑选一个单元格，如果这个单元格有多面墙联系着已存在的迷宫通路，我们就随机选择一面墙打通。
     相对于深度优先的算法，Prim随机算法不是优先选择最近选中的单元格，而是随机的从所有的列表中的单元格进行选择，新加入的单元格和旧加入的单元格同样概率会被选择，新加入的单元格没有有优先权。因此其分支更多，生成的迷宫更复杂，难度更大，也更自然。
+    实现上格子使用一维下标，待选列表为两个 array，随机取出时与末尾交换后弹出(O(1))，由于是等概率选取，入列顺序不影响生成结果的分布
     '''
+    return drive(primg_steps(size, starts, ends, visible = callback is not None), callback)
+
+
+def primg_steps(size, starts, ends, visible = True):
+    '''primg 的分步版本: 每一步产出一次地图网格，结束时的返回值(StopIteration.value)为生成的地图；visible 为 False 时不产出，直接运行到结束'''
     if not _valid_check(size, starts, ends):
         return []
+    height, width = size
     m = Map(size, default = Point.Wall)
-    visited_flag = [[False for _ in range(size[1])] for _ in range(size[0])] # 防止还在队列里的被重复打通，则会存在环路
+    cells, carve = _carve_buffer(m, visible)
+    visited_flag = bytearray(height * width) # 防止还在队列里的被重复打通，则会存在环路
+    offsets = ((-2, 0, -2 * width), (2, 0, 2 * width), (0, -2, -2), (0, 2, 2)) # 上下左右: 行偏移、列偏移、一维下标偏移
 
-    queue = [[start, (-1, -1)] for start in starts] # 当前点，前一个点
-    while queue:
-        cur, pre = queue.pop(random.randint(0, len(queue) - 1))
-        if _valid_neighbour(m, cur) < 1:
+    queue_cur = array('i', (p[0] * width + p[1] for p in starts)) # 当前点
+    queue_pre = array('i', (-1 for _ in starts)) # 前一个点
+    while queue_cur:
+        k = random.randint(0, len(queue_cur) - 1)
+        cur, pre = queue_cur[k], queue_pre[k]
+        queue_cur[k], queue_pre[k] = queue_cur[-1], queue_pre[-1] # 与末尾交换后弹出
+        queue_cur.pop()
+        queue_pre.pop()
+        if not _wall_neighbour(cells, size, cur):
             continue
-        m.data[cur[0]][cur[1]] = Point.Chan
-        visited_flag[cur[0]][cur[1]] = True
-
-        if pre[0] != -1 and cur[0] == pre[0]:
-            m.data[cur[0]][min(cur[1], pre[1]) + 1] = Point.Chan
-        elif pre[1] != -1 and cur[1] == pre[1]:
-            m.data[min(cur[0], pre[0]) + 1][cur[1]] = Point.Chan
+        carve(cur)
+        visited_flag[cur] = 1
+        if pre != -1:
+            carve((cur + pre) // 2) # 两点之间的墙
 
-        if callback is not None:
-            callback(m.data)
-
-        udlr = [(cur[0] - 2, cur[1]), (cur[0] + 2, cur[1]), (cur[0], cur[1] - 2), (cur[0], cur[1] + 2),]
-        random.shuffle(udlr)
-        for p in udlr:
-            if 0 <= p[0] < size[0] and 0 <= p[1] < size[1] and m.data[p[0]][p[1]] == Point.Wall and not visited_flag[p[0]][p[1]]:
-                queue.append([p, cur])
-                visited_flag[p[0]][p[1]] = True # 目标点已经追加过
+        if visible:
+            yield m.data
 
+        row, col = divmod(cur, width)
+        for dr, dc, di in offsets:
+            p = cur + di
+            if 0 <= row + dr < height and 0 <= col + dc < width and cells[p] == Point.Wall and not visited_flag[p]:
+                queue_cur.append(p)
+                queue_pre.append(cur)
+                visited_flag[p] = 1 # 目标点已经追加过
     # start 和 end 之间差非偶数的情况下无法联通，需要链接终点到最近的可行点
-    m = _connect_points(m, ends)
+    return _finish(m, starts, ends, visible, ends)
 
-    for p in starts:
-        m.data[p[0]][p[1]] = Point.Start
-    for p in ends:
-        m.data[p[0]][p[1]] = Point.End
-    return m
+
+def _find_root(parent, x):
+    '''并查集查找根节点，同时做路径压缩'''
+    root = x
+    while parent[root] != root:
+        root = parent[root]
+    while parent[x] != root:
+        parent[x], x = root, parent[x]
+    return root
 
 
 def kruskalg(size, starts, ends, callback = None):
@@ -198,23 +321,380 @@ def kruskalg(size, starts, ends, callback = None):
         2.如果属于同一个集合，则直接将当前选中的墙移出列表
     3.不断重复第 2 步，直到所有墙都检测过
     该算法同样不会出现明显的主路，岔路也比较多
-    Pyhthon 实现可以参考(代码太难看): https://blog.csdn.net/cj12345657582255/article/details/115605195
+    实现上单元为偶数坐标的格子，并查集使用一维数组(按秩合并 + 路径压缩)，墙的列表预先整体打乱后顺序遍历，整体接近线性复杂度
     '''
+    return drive(kruskalg_steps(size, starts, ends, visible = callback is not None), callback)
+
+
+def kruskalg_steps(size, starts, ends, visible = True):
+    '''kruskalg 的分步版本: 每一步产出一次地图网格，结束时的返回值(StopIteration.value)为生成的地图；visible 为 False 时不产出，直接运行到结束'''
+    if not _valid_check(size, starts, ends):
+        return []
+    height, width = size
     m = Map(size, default = Point.Wall)
-    print("Unrelized method kruskalg")
-    traceback.print_stack()
+    cells, carve = _carve_buffer(m, visible)
+    rows, cols = (height + 1) // 2, (width + 1) // 2 # 单元的行列数
+    parent, rank = array('i', range(rows * cols)), bytearray(rows * cols)
+    edges = array('i', (k * 2 + d for k in range(rows * cols) for d in (0, 1) # 单元 k 与右侧(0)或下方(1)单元之间的墙
+                        if (d == 0 and k % cols < cols - 1) or (d == 1 and k // cols < rows - 1)))
+    random.shuffle(edges)
+
+    for k in range(rows * cols): # 所有单元都是通路
+        carve(k // cols * 2 * width + k % cols * 2)
+    if visible:
+        yield m.data
+    remain = rows * cols - 1 # 还需要合并的次数
+    for e in edges:
+        if remain == 0:
+            break
+        a, d = e >> 1, e & 1
+        b = a + 1 if d == 0 else a + cols
+        ra, rb = _find_root(parent, a), _find_root(parent, b)
+        if ra == rb:
+            continue
+        if rank[ra] < rank[rb]:
+            ra, rb = rb, ra
+        parent[rb] = ra
+        if rank[ra] == rank[rb]:
+            rank[ra] += 1
+        remain -= 1
+        wall = a // cols * 2 * width + a % cols * 2 + (1 if d == 0 else width)
+        carve(wall)
+        if visible:
+            yield m.data
+    return _finish(m, starts, ends, visible)
+
+
+def eller_rows(width, height = None, starts = (), ends = ()):
+    '''Eller算法逐行生成迷宫，依次产出每一行的原始字节(长度为 width)，内存只与宽度相关
+    1.第一行的每个单元各自属于一个集合
+    2.随机打通同一行中相邻且属于不同集合的单元，并合并集合
+    3.每个集合至少随机选一个单元向下打通，下一行中未被打通的单元各自属于新的集合
+    4.最后一行打通所有相邻且属于不同集合的单元
+    height 为 None 时无限生成，由调用方决定何时停止(如滚动的无尽迷宫)；starts/ends 会直接标记在对应的行上，应位于偶数坐标
+    '''
+    cols = (width + 1) // 2 # 单元为偶数坐标的格子
+    rows = None if height is None else (height + 1) // 2
+    marks = {}
     for p in starts:
-        m.data[p[0]][p[1]] = Point.Start
+        marks.setdefault(p[0], []).append((p[1], Point.Start))
     for p in ends:
-        m.data[p[0]][p[1]] = Point.End
-    return m
+        marks.setdefault(p[0], []).append((p[1], Point.End))
+    wall_row = bytes([Point.Wall]) * width
+    label = array('i', range(cols)) # 当前行各单元所属集合
+    parent = array('i', range(cols)) # 每行重置的并查集，用于合并集合
+    grid_row = 0
+
+    def emit(row):
+        nonlocal grid_row
+        for n, value in marks.get(grid_row, ()):
+            row[n] = value
+        grid_row += 1
+        return bytes(row)
+
+    i = 0
+    while rows is None or i < rows:
+        last = rows is not None and i == rows - 1
+        for k in range(cols):
+            parent[k] = k
+        row = bytearray(wall_row)
+        row[0::2] = bytes([Point.Chan]) * cols
+        for j in range(cols - 1): # 横向打通
+            a, b = _find_root(parent, label[j]), _find_root(parent, label[j + 1])
+            if a != b and (last or random.random() < 0.5):
+                parent[b] = a
+                row[2 * j + 1] = Point.Chan
+        yield emit(row)
+        if last:
+            break
+
+        root = [_find_root(parent, label[j]) for j in range(cols)]
+        groups = {}
+        for j in range(cols):
+            groups.setdefault(root[j], []).append(j)
+        down = bytearray(cols)
+        for members in groups.values(): # 每个集合至少向下打通一个
+            down[random.choice(members)] = 1
+            for j in members:
+                if random.random() < 0.5:
+                    down[j] = 1
+        row, used = bytearray(wall_row), set()
+        for j in range(cols):
+            if down[j]:
+                row[2 * j] = Point.Chan
+                label[j] = root[j]
+                used.add(root[j])
+        free = (k for k in range(cols) if k not in used)
+        for j in range(cols):
+            if not down[j]:
+                label[j] = next(free)
+        yield emit(row)
+        i += 1
+    if height is not None and height % 2 == 0:
+        yield emit(bytearray(wall_row))
+
+
+def ellerg(size, starts, ends, callback = None):
+    '''Eller算法生成迷宫，逐行调用 eller_rows 填充到地图中，每生成一行回调一次
+    该算法生成的迷宫没有明显的主路，需要流式生成超大迷宫时直接使用 eller_rows 搭配 MapWriter
+    '''
+    return drive(ellerg_steps(size, starts, ends, visible = callback is not None), callback)
+
+
+def ellerg_steps(size, starts, ends, visible = True):
+    '''ellerg 的分步版本: 每一步产出一次地图网格，结束时的返回值(StopIteration.value)为生成的地图；visible 为 False 时不产出，直接运行到结束'''
+    if not _valid_check(size, starts, ends):
+        return []
+    height, width = size
+    m = Map(size, default = Point.Wall)
+    for r, row in enumerate(eller_rows(width, height)):
+        if not visible:
+            m.data.buf[r * width:(r + 1) * width] = row
+            continue
+        for n, value in enumerate(row):
+            if value == Point.Chan:
+                m.data.set(r, n, Point.Chan)
+        yield m.data
+    return _finish(m, starts, ends, visible)
+
+
+def wilsong(size, starts, ends, callback = None, hybrid = False):
+    '''Wilson算法生成迷宫 - 均匀生成树，没有dfsg的长主路也没有primg的短小分叉
+    1.任选一个单元加入迷宫
+    2.从任一不在迷宫中的单元出发随机游走，直到碰到迷宫中的单元
+    3.擦除游走路径中的环(只记录每个单元最后一次离开的方向，沿方向走一遍即为去环路径)，并把该路径加入迷宫
+    4.重复第 2 步直到所有单元都在迷宫中
+    Wilson算法开始时迷宫很小，随机游走要很久才能碰到；Aldous-Broder算法(随机游走，首次到达的单元就打通)则是后期很慢，
+    hybrid 为 True 时先用 Aldous-Broder 生成约三分之一的单元，再切换为 Wilson，速度更快，但中途切换会使结果略微偏离均匀分布
+    实现上单元为偶数坐标的格子，游走方向记录在一维 bytearray 中，去环不需要额外的路径列表
+    '''
+    return drive(wilsong_steps(size, starts, ends, hybrid = hybrid, visible = callback is not None), callback)
+
+
+def wilsong_steps(size, starts, ends, hybrid = False, visible = True):
+    '''wilsong 的分步版本: 每一步产出一次地图网格，结束时的返回值(StopIteration.value)为生成的地图；visible 为 False 时不产出，直接运行到结束'''
+    if not _valid_check(size, starts, ends):
+        return []
+    height, width = size
+    m = Map(size, default = Point.Wall)
+    cells, carve = _carve_buffer(m, visible)
+    rows, cols = (height + 1) // 2, (width + 1) // 2 # 单元的行列数
+    total = rows * cols
+    in_tree = bytearray(total)
+    nxt = bytearray(total) # 随机游走时每个单元最后一次离开的方向
+    steps = (-cols, cols, -1, 1) # 上下左右: 单元的一维下标偏移
+    walls = (-width, width, -1, 1) # 上下左右: 单元与墙的一维下标偏移
+    rand = random.getrandbits
+
+    def step(k):
+        '''随机选择一个不越界的方向，返回 (方向, 相邻单元)'''
+        r, c = divmod(k, cols)
+        while True:
+            d = rand(2)
+            if (d == 0 and r > 0) or (d == 1 and r < rows - 1) or (d == 2 and c > 0) or (d == 3 and c < cols - 1):
+                return d, k + steps[d]
+
+    def add(k, d = None):
+        '''单元 k 加入迷宫，d 不为 None 时同时打通它朝 d 方向的墙'''
+        in_tree[k] = 1
+        cell = k // cols * 2 * width + k % cols * 2
+        carve(cell)
+        if d is not None:
+            carve(cell + walls[d])
+
+    root = starts[0][0] // 2 * cols + starts[0][1] // 2
+    add(root)
+    count = 1
+    if visible:
+        yield m.data
+
+    if hybrid: # Aldous-Broder 阶段: 新到达的单元从来的方向打通
+        cur = root
+        while count * 3 < total:
+            d, p = step(cur)
+            if not in_tree[p]:
+                add(p, d ^ 1) # 上下、左右的方向编号只差最低位
+                count += 1
+                if visible:
+                    yield m.data
+            cur = p
+
+    for k in range(total): # Wilson 阶段: 按顺序选择起点(顺序不影响均匀性)
+        if in_tree[k]:
+            continue
+        cur = k
+        while not in_tree[cur]: # 随机游走，覆盖写入离开方向即完成去环
+            d, p = step(cur)
+            nxt[cur] = d
+            cur = p
+        cur = k
+        while not in_tree[cur]: # 沿去环后的路径加入迷宫
+            d = nxt[cur]
+            add(cur, d)
+            cur += steps[d]
+        if visible:
+            yield m.data
+    return _finish(m, starts, ends, visible)
+
+
+def _numpy_canvas(m, visible):
+    '''numpy 生成算法使用的 (height, width) 画布及同步函数
+    不产出中间结果时画布就是地图底层存储的视图(结束后需 reindex)；否则外部可能持有地图快照，因此画布独立，
+    sync(rows, cols) 把画布该区域相对上次同步的变化经 Grid 写入地图
+    '''
+    if np is None:
+        raise ImportError("numpy generators require numpy: pip install numpy")
+    grid = m.data
+    if not visible:
+        return grid.to_numpy(), lambda rows = None, cols = None: None
+    canvas = np.frombuffer(grid.tobytes(), dtype = np.uint8).reshape(m.size).copy()
+    shadow = canvas.copy() # 已写入地图的内容
+    def sync(rows = slice(None), cols = slice(None)):
+        r0, c0 = rows.indices(m.size[0])[0], cols.indices(m.size[1])[0]
+        for r, c in zip(*np.nonzero(canvas[rows, cols] != shadow[rows, cols])):
+            grid.set(r0 + int(r), c0 + int(c), Point(int(canvas[r0 + r, c0 + c])))
+        shadow[rows, cols] = canvas[rows, cols]
+    return canvas, sync
+
+
+def divisiong(size, starts, ends, callback = None):
+    '''递归分割算法生成迷宫 (需要 numpy)
+    1.让迷宫全是通路
+    2.在当前区域中随机画一道横墙或竖墙(区域较宽时画竖墙，较高时画横墙)，把区域分为两半，并在墙上随机开一个口
+    3.对两个子区域重复第 2 步，直到区域只剩一行或一列单元
+    该算法生成的迷宫有明显的长直墙，整体呈矩形块状结构
+    实现上每道墙是一次 numpy 切片赋值，待分割区域用显式的栈保存，不受递归深度限制
+    '''
+    return drive(divisiong_steps(size, starts, ends, visible = callback is not None), callback)
+
+
+def divisiong_steps(size, starts, ends, visible = True):
+    '''divisiong 的分步版本: 每一步产出一次地图网格，结束时的返回值(StopIteration.value)为生成的地图；visible 为 False 时不产出，直接运行到结束'''
+    if not _valid_check(size, starts, ends):
+        return []
+    height, width = size
+    m = Map(size, default = Point.Chan)
+    canvas, sync = _numpy_canvas(m, visible)
+    if height % 2 == 0: # 偶数尺寸时最后一行/列不属于任何单元
+        canvas[-1, :] = Point.Wall
+    if width % 2 == 0:
+        canvas[:, -1] = Point.Wall
+    if visible:
+        sync()
+        yield m.data
+
+    stack = [(0, 0, (height + 1) // 2, (width + 1) // 2)] # 待分割区域: 起始单元行列及单元行列数
+    while stack:
+        r, c, rows, cols = stack.pop()
+        if rows < 2 or cols < 2:
+            continue
+        horizontal = rows > cols if rows != cols else random.random() < 0.5
+        if horizontal:
+            k = random.randint(1, rows - 1) # 墙位于第 k-1 和第 k 行单元之间
+            wall, span = 2 * (r + k) - 1, slice(2 * c, 2 * (c + cols) - 1)
+            canvas[wall, span] = Point.Wall
+            canvas[wall, 2 * (c + random.randrange(cols))] = Point.Chan
+            sync(slice(wall, wall + 1), span)
+            stack.append((r, c, k, cols))
+            stack.append((r + k, c, rows - k, cols))
+        else:
+            k = random.randint(1, cols - 1)
+            wall, span = 2 * (c + k) - 1, slice(2 * r, 2 * (r + rows) - 1)
+            canvas[span, wall] = Point.Wall
+            canvas[2 * (r + random.randrange(rows)), wall] = Point.Chan
+            sync(span, slice(wall, wall + 1))
+            stack.append((r, c, rows, k))
+            stack.append((r, c + k, rows, cols - k))
+        if visible:
+            yield m.data
+    return _finish(m, starts, ends, visible)
+
+
+def _cell_views(canvas, rows, cols):
+    '''单元、单元上方的墙、单元左侧的墙三个视图，形状分别为 (rows, cols)、(rows - 1, cols)、(rows, cols - 1)'''
+    return (canvas[0:2 * rows - 1:2, 0:2 * cols - 1:2],
+            canvas[1:2 * rows - 1:2, 0:2 * cols - 1:2],
+            canvas[0:2 * rows - 1:2, 1:2 * cols - 1:2])
+
+
+def _sync_rows(m, sync, visible):
+    '''产出中间结果时逐行单元同步到地图，每行产出一次'''
+    if not visible:
+        return
+    for r in range(0, m.size[0], 2):
+        sync(slice(max(r - 1, 0), r + 1))
+        yield m.data
+
+
+def binarytreeg(size, starts, ends, callback = None):
+    '''二叉树算法生成迷宫 (需要 numpy)
+    每个单元随机打通上方或左侧的墙(第一行只能向左，第一列只能向上)，各单元之间互不依赖
+    该算法生成的迷宫第一行和第一列是贯通的长廊，整体有明显的左上方向偏向
+    实现上所有单元的方向用一次 numpy 随机数生成，打通墙是布尔下标赋值，没有逐格的 Python 循环
+    '''
+    return drive(binarytreeg_steps(size, starts, ends, visible = callback is not None), callback)
+
+
+def binarytreeg_steps(size, starts, ends, visible = True):
+    '''binarytreeg 的分步版本: 每一步产出一次地图网格，结束时的返回值(StopIteration.value)为生成的地图；visible 为 False 时不产出，直接运行到结束'''
+    if not _valid_check(size, starts, ends):
+        return []
+    height, width = size
+    m = Map(size, default = Point.Wall)
+    canvas, sync = _numpy_canvas(m, visible)
+    rows, cols = (height + 1) // 2, (width + 1) // 2
+    rng = np.random.default_rng(random.getrandbits(64)) # 随 random.seed 可复现
+    cells, up, left = _cell_views(canvas, rows, cols)
+
+    north = rng.integers(0, 2, (rows, cols), dtype = np.uint8).astype(bool)
+    north[0, :], north[:, 0] = False, True
+    cells[:] = Point.Chan
+    up[north[1:]] = Point.Chan
+    left[~north[:, 1:]] = Point.Chan
+    yield from _sync_rows(m, sync, visible)
+    return _finish(m, starts, ends, visible)
+
+
+def sidewinderg(size, starts, ends, callback = None):
+    '''Sidewinder算法生成迷宫 (需要 numpy)
+    1.第一行全部打通
+    2.其余每一行从左到右维护一段连续的单元，每个单元随机决定继续向右打通或结束这一段
+    3.每段结束时，从段中随机选一个单元向上打通
+    该算法生成的迷宫第一行是贯通的长廊，没有二叉树算法那么明显的对角偏向
+    实现上所有单元是否结束段用一次 numpy 随机数生成，各段的起止下标、向上打通的单元均由数组运算得到
+    '''
+    return drive(sidewinderg_steps(size, starts, ends, visible = callback is not None), callback)
+
+
+def sidewinderg_steps(size, starts, ends, visible = True):
+    '''sidewinderg 的分步版本: 每一步产出一次地图网格，结束时的返回值(StopIteration.value)为生成的地图；visible 为 False 时不产出，直接运行到结束'''
+    if not _valid_check(size, starts, ends):
+        return []
+    height, width = size
+    m = Map(size, default = Point.Wall)
+    canvas, sync = _numpy_canvas(m, visible)
+    rows, cols = (height + 1) // 2, (width + 1) // 2
+    rng = np.random.default_rng(random.getrandbits(64)) # 随 random.seed 可复现
+    cells, up, left = _cell_views(canvas, rows, cols)
+
+    close = rng.random((rows, cols)) < 0.5 # 单元是否结束当前段
+    close[0, :], close[:, -1] = False, True # 段不跨行
+    cells[:] = Point.Chan
+    left[~close[:, :-1]] = Point.Chan # 单元与右侧单元之间的墙即右侧单元左侧的墙
+    if rows > 1:
+        last = np.flatnonzero(close[1:]) # 第二行开始所有段的结束位置(按行展开)
+        begins = np.concatenate(([0], last[:-1] + 1))
+        pick = begins + (rng.random(len(last)) * (last - begins + 1)).astype(np.int64)
+        up[pick // cols, pick % cols] = Point.Chan
+    yield from _sync_rows(m, sync, visible)
+    return _finish(m, starts, ends, visible)
 
 
 if __name__ == '__main__':
     import doctest
     doctest.testmod()  # verbose=True shows the output
     
-    # generate = primg # dfsg, primg, kruskalg
+    # generate = primg # dfsg, primg, kruskalg, ellerg, wilsong, divisiong, binarytreeg, sidewinderg
     # callback = lambda m: print('\n'.join(["-----", ] + [' '.join([p.name[0] for p in row]) for row in m]))
     # m = generate((3, 3), [(0, 0),], [(2, 2),], callback=callback)
     # print(m)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-17 23:03:21
+# @Author  : HeLiang (helianghit@foxmail.com)
+# @Link    : https://github.com/HeLiangHIT
+# 此处r主要是为了支持在 doctest 命令中使用 \n
+r'''
+路口图: 把迷宫中两侧都是墙的通道压缩为一条带长度的边，节点为死胡同、岔路口和起止点，
+完美迷宫的节点数通常只有格子数的几分之一，在图上求最短路后再把通道展开为格子路径，使用示例如下:
+>>> m = Map((5, 5), default = Point.Wall)
+>>> for p in [(0, 0), (0, 1), (0, 2), (0, 3), (0, 4), (1, 2), (2, 2), (3, 2), (4, 2), (4, 3), (4, 4), (1, 0), (2, 0)]: m.data[p[0]][p[1]] = Point.Chan
+>>> m.data[0][0] = Point.Start; m.data[4][4] = Point.End
+>>> g = JunctionGraph.of(m.data); print(g) # 起点、终点、(0, 2)的岔路口、(0, 4)和(2, 0)的死胡同
+JunctionGraph(5 nodes, 4 edges)
+>>> g.shortest_path([(0, 0),], [(4, 4),])
+[(0, 0), (0, 1), (0, 2), (1, 2), (2, 2), (3, 2), (4, 2), (4, 3), (4, 4)]
+>>> g.shortest_path([(1, 2),], [(0, 4), (2, 0)]) # 起止点也可以在通道中间
+[(1, 2), (0, 2), (0, 3), (0, 4)]
+>>> JunctionGraph.of(m.data) is g # 按地图缓存，地图结构不变时直接复用
+True
+>>> m.data[1][1] = Point.Chan; JunctionGraph.of(m.data) is g # 打通墙后重新构建
+False
+>>> junction_search(m.data, [(0, 0),], [(4, 4),]) # 与 bfs 相同的入参和返回格式
+[[(0, 0), (0, 1), (0, 2), (1, 2), (2, 2), (3, 2), (4, 2), (4, 3), (4, 4)]]
+>>> len(junction_search(m.data, [(1, 2),], [(0, 4), (2, 0)], max_paths = 2)) # 需要多条路径时退化为 bfs
+2
+'''
+import heapq
+from array import array
+from .map import Point, Map, Grid
+from .search import _valid_check, _PaddedGrid, bfs_steps
+from .events import drive
+
+
+class JunctionGraph(_PaddedGrid):
+    '''由网格构建的路口图，非墙的格子均可通行，格子使用补墙后的一维下标
+    nodes[k] 为第 k 个节点的下标；edges[e] = (节点a, 节点b, 长度, 通道格子)，通道格子为从 a 到 b 依次经过的下标(不含两端)
+    每个通道格子记录所在的边及其在通道中的位置，起止点在通道中间时也能 O(1) 接入图中
+    '''
+    def __init__(self, grid):
+        super().__init__(grid)
+        self._size, stride, cells = grid.size, self._stride, self._cells
+        size = len(cells)
+        node_of = array('i', [-1]) * size # 格子对应的节点编号
+        self.nodes = []
+        marked = set(self._pid(p) for v in Grid.MARKED for p in grid.positions(v)) # 起止点也作为节点
+        for j in range(stride + 1, size - stride - 1):
+            if cells[j] and (cells[j - stride] + cells[j + stride] + cells[j - 1] + cells[j + 1] != 2 or j in marked):
+                node_of[j] = len(self.nodes)
+                self.nodes.append(j)
+        self.node_of = node_of
+        self.edge_of = array('i', [-1]) * size # 通道格子所在的边
+        self.pos_of = array('i', [0]) * size # 通道格子在边中的位置
+        self.edges = []
+        self.adj = [[] for _ in self.nodes] # adj[节点] = [(相邻节点, 边), ...]
+        for a, start in enumerate(self.nodes):
+            self._walk_from(a, start)
+        for j in range(size): # 没有任何节点的环形通道，取其中一个格子作为节点
+            if cells[j] and node_of[j] == -1 and self.edge_of[j] == -1:
+                node_of[j] = len(self.nodes)
+                self.nodes.append(j)
+                self.adj.append([])
+                self._walk_from(node_of[j], j)
+
+    def _walk_from(self, a, start):
+        # 从节点 a 出发沿每个方向的通道走到下一个节点，通道已经记录过的跳过(从另一端记录过)
+        cells, node_of, edge_of = self._cells, self.node_of, self.edge_of
+        for d in self._offsets:
+            first = start + d
+            if not cells[first]:
+                continue
+            if node_of[first] != -1: # 两个节点直接相邻
+                if a < node_of[first]:
+                    self._add_edge(a, node_of[first], array('i'))
+                continue
+            if edge_of[first] != -1:
+                continue
+            run, prev, cur = array('i'), start, first
+            while node_of[cur] == -1:
+                run.append(cur)
+                for d in self._offsets: # 通道格子恰好有两个可通行的相邻格子，走向不是来处的那个
+                    nxt = cur + d
+                    if cells[nxt] and nxt != prev:
+                        break
+                prev, cur = cur, nxt
+            self._add_edge(a, node_of[cur], run)
+
+    def _add_edge(self, a, b, run):
+        e = len(self.edges)
+        self.edges.append((a, b, len(run) + 1, run))
+        for k, j in enumerate(run):
+            self.edge_of[j], self.pos_of[j] = e, k
+        self.adj[a].append((b, e))
+        if b != a:
+            self.adj[b].append((a, e))
+
+    def __repr__(self):
+        return f"JunctionGraph({len(self.nodes)} nodes, {len(self.edges)} edges)"
+
+    @staticmethod
+    def of(grid):
+        '''返回网格对应的路口图，按网格的拓扑版本号缓存'''
+        return grid.cached("junction_graph", JunctionGraph)
+
+    def _attach(self, i):
+        '''格子 i 接入图中的方式: [(节点, 距离, 从格子到节点经过的格子)]'''
+        if self.node_of[i] != -1:
+            return [(self.node_of[i], 0, [])]
+        e = self.edge_of[i]
+        if e == -1: # 墙
+            return []
+        a, b, length, run = self.edges[e]
+        k = self.pos_of[i]
+        return [(a, k + 1, list(reversed(run[:k]))), (b, length - k - 1, list(run[k + 1:]))]
+
+    def _corridor(self, e, frm):
+        '''沿边 e 从节点 frm 走到另一端经过的格子(不含两端)'''
+        a, b, _, run = self.edges[e]
+        return list(run) if frm == a else list(reversed(run))
+
+    def _heuristic(self, dst_ids):
+        '''到最近终点的曼哈顿距离，边长不小于两端的曼哈顿距离，因此是一致的启发函数；终点较多时退化为 Dijkstra'''
+        if len(dst_ids) > 8:
+            return lambda j: 0
+        stride, goals = self._stride, [divmod(t, self._stride) for t in dst_ids]
+        return lambda j: min(abs(j // stride - m) + abs(j % stride - n) for m, n in goals)
+
+    def shortest_path(self, srcs, targets):
+        '''多点对多点的最短路(在图上做 A*)，返回格子坐标列表，不可达时返回 None'''
+        src_ids = [self._pid(p) for p in srcs]
+        dst_ids = set(self._pid(p) for p in targets)
+        h, nodes = self._heuristic(dst_ids), self.nodes
+        best, best_path = None, None # 当前最短的结果及其一维下标路径
+        dist, pre = {}, {} # 节点的最短距离，前序 (前一个节点, 边) 或 (起点格子, 接入路径)
+        q = []
+        for s in src_ids:
+            if s in dst_ids:
+                return [self._coord(s), self._coord(s)] # 与 bfs 一致: 起点即终点
+            for node, d, via in self._attach(s):
+                if d < dist.get(node, d + 1):
+                    dist[node], pre[node] = d, (None, [s] + via)
+                    heapq.heappush(q, (d + h(nodes[node]), d, node))
+            if self.node_of[s] == -1 and self.edge_of[s] != -1: # 起点与终点在同一条通道中
+                e, k = self.edge_of[s], self.pos_of[s]
+                run = self.edges[e][3]
+                for t in dst_ids:
+                    if self.node_of[t] == -1 and self.edge_of[t] == e and (best is None or abs(self.pos_of[t] - k) < best):
+                        kt = self.pos_of[t]
+                        best = abs(kt - k)
+                        best_path = list(run[k:kt + 1]) if kt >= k else list(reversed(run[kt:k + 1]))
+        exits = {} # 节点 -> [(距离, 从节点到终点经过的格子)]
+        for t in dst_ids:
+            for node, d, via in self._attach(t):
+                exits.setdefault(node, []).append((d, list(reversed(via)) + [t]))
+
+        while q:
+            f, d, node = heapq.heappop(q)
+            if d > dist[node]:
+                continue
+            if best is not None and f >= best:
+                break
+            for extra, tail in exits.get(node, ()):
+                if best is None or d + extra < best:
+                    best, best_path = d + extra, self._node_path(node, pre) + tail[1 if extra == 0 else 0:]
+            for nxt, e in self.adj[node]:
+                nd = d + self.edges[e][2]
+                if nd < dist.get(nxt, nd + 1):
+                    dist[nxt], pre[nxt] = nd, (node, e)
+                    heapq.heappush(q, (nd + h(nodes[nxt]), nd, nxt))
+        if best_path is None:
+            return None
+        return [self._coord(j) for j in best_path]
+
+    def _node_path(self, node, pre):
+        # 回溯从起点格子到节点的格子路径(含节点)
+        parts = []
+        while True:
+            frm, e = pre[node]
+            if frm is None: # 到达起点，e 为从起点格子到节点经过的格子
+                parts.append(e + [self.nodes[node]] if e[-1:] != [self.nodes[node]] else e)
+                break
+            parts.append(self._corridor(e, frm) + [self.nodes[node]])
+            node = frm
+        return [i for part in reversed(parts) for i in part]
+
+
+def junction_search(mdata, srcs, targets, max_steps = 20000, max_paths = 1, callback = None):
+    '''
+    基于路口图的最短路算法，入参和返回格式与 bfs 相同；路口图按地图缓存，同一张地图的重复查询只需在图上搜索
+    NOTE: mdata 为 Grid 或二维数组，二维数组每次都要重新构建图；非墙的格子均可通行
+    在图上搜索只能得到一条最短路，也没有逐格访问的过程，因此 max_paths > 1 或设置了 callback 时退化为 bfs，否则不使用 max_steps
+    '''
+    return drive(junction_search_steps(mdata, srcs, targets, max_steps, max_paths, visible = callback is not None), callback)
+
+
+def junction_search_steps(mdata, srcs, targets, max_steps = 20000, max_paths = 1, visible = True):
+    '''junction_search 的分步版本，结束时的返回值(StopIteration.value)为路径列表；max_paths > 1 或 visible 为 True 时退化为 bfs_steps，
+    否则在路口图上搜索，不产出任何中间帧，第一次 next 即结束
+    '''
+    if max_paths > 1 or visible:
+        return (yield from bfs_steps(mdata, srcs, targets, max_steps, max_paths, visible))
+    if not _valid_check(mdata, srcs, targets):
+        return []
+    grid = mdata if isinstance(mdata, Grid) else Grid.from_rows(mdata)
+    path = JunctionGraph.of(grid).shortest_path(srcs, targets)
+    return [path] if path else []
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()  # verbose=True shows the output
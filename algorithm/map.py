@@ -28,43 +28,743 @@ C C C C C C C C C C
 C W C C C C C C C C
     ...
 >>> os.remove("./empty.map")
+>>> m1.data[0][0] = Point.Start; m1.save("./empty.map", fmt = "binary"); print(os.path.getsize("./empty.map")) # 每格1位
+52
+>>> m2 = Map.load("./empty.map"); print(m2.data[1][1].name, m2.data[0][0].name, m2.size)
+Wall Start (10, 10)
+>>> m1.data[2][2] = Point.Visited; m1.save("./empty.map", fmt = "binary"); m2 = Map.load("./empty.map"); print(m2) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+10X10:
+S C C C C C C C C C
+C W C C C C C C C C
+C C V C C C C C C C
+    ...
+>>> Map.load("./empty.map").save("./empty.map", fmt = "binary"); print(Map.load("./empty.map").diff(m1)) # 按需加载的地图可以保存回原文件
+[]
+>>> os.remove("./empty.map"); m1.data[0][0] = Point.Chan; m1.data[2][2] = Point.Chan
 >>> m1.data[0][0] = Point.Start;m1.data[9][9] = Point.End;print(Map().diff(m1))
 [(0, 0, <Point.Start: 3>), (1, 1, <Point.Wall: 2>), (9, 9, <Point.End: 4>)]
 >>> print(m1.start, m1.end)
 [(0, 0)] [(9, 9)]
+>>> m1.set(0, 0, Point.Visited); print(m1.start, m1.count(Point.Visited), m1.count(Point.Wall)); m1.set(0, 0, Point.Start)
+[] 1 1
 >>> txt = m1.to_json(); print(txt)
 {"data": [[3, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 2, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1, 1, 1, 1, 4]]}
+>>> s = m1.snapshot(); s.data[5][5] = Point.Visited; print(m1.diff(s), m1.data[5][5].name) # 写时复制的快照
+[(5, 5, <Point.Visited: 5>)] Chan
 >>> m2, isok = Map().from_json(txt); print(m2) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
 10X10:
 S C C C C C C C C C
 C W C C C C C C C C
 ...
+>>> g = Map((2, 3), default = Point.Wall).data; g[1][2] = Point.End; print(g.size, g.width, list(g.buf)) # 紧凑存储
+(2, 3) 3 [2, 2, 2, 2, 2, 4]
+>>> print(repr(g[1][2]), list(g[1]), len(g))
+<Point.End: 4> [<Point.Wall: 2>, <Point.Wall: 2>, <Point.End: 4>] 2
+>>> m = Map((3, 3)); m.data[1][0] = m.data[1][1] = Point.Wall; print(m.connected((0, 0), (2, 0)), m.component_size((0, 0))) # 连通分量索引
+True 7
+>>> m.data[1][2] = Point.Wall; print(m.connected((0, 0), (2, 0)), m.component_size((0, 0)), m.data.connectivity().component_sizes()) # 砌墙后只重新标记被切断的一侧
+False 3 [3, 3]
+>>> m.data[1][1] = Point.Chan; print(m.connected((0, 0), (2, 0)), m.component_size((2, 2)))
+True 7
 '''
 import os
 import pickle
 import json
-import copy
+import mmap
+import struct
+import re
+from array import array
+from collections import deque
+from itertools import chain
 from enum import IntEnum
+try:
+    import numpy as np # 可选依赖，仅 backend = "numpy" 时需要
+except ImportError:
+    np = None
 
 
 Point = IntEnum('Point', ('Chan', 'Wall', 'Start', 'End', "Visited", "NxtVisit")) # Enum is not JSON serializable
+_POINTS = (None, ) + tuple(Point) # 数值到 Point 的查找表，避免每次构造枚举
+_WALL = int(Point.Wall) # 热路径中避免访问枚举属性
+_NAMES = bytes.maketrans(bytes(p.value for p in Point), bytes(ord(p.name[0]) for p in Point)) # 数值到首字母，用于快速打印
+
+# 二进制地图格式: 头部(魔数、版本、每格位数、高、宽、起点数、终点数) + 起止点坐标 + 按行对齐的位压缩数据
+_MAGIC = b"MAZE"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBBxxIIII")
+_COORD = struct.Struct("<II")
+_BIT1_ENC = bytes.maketrans(bytes(p.value for p in Point), b"010000") # 1位编码: 墙为1，其余(通道/起止点)为0
+_BIT1_DEC = bytes.maketrans(b"01", bytes((Point.Chan, Point.Wall)))
+_BIT3_ENC = bytes.maketrans(bytes(range(8)), b"01234567") # 3位编码即一个八进制数字
+_BIT3_DEC = bytes.maketrans(b"01234567", bytes(range(8)))
+
+
+def _find_all(raw, value):
+    '''在字节串中查找所有等于 value 的下标'''
+    i = raw.find(value)
+    while i >= 0:
+        yield i
+        i = raw.find(value, i + 1)
+
+
+class _Row(object):
+    '''Grid 的行视图，支持 row[n] 读写和迭代，兼容原来 data[m][n] 的用法'''
+    __slots__ = ('_grid', '_m')
+    def __init__(self, grid, m):
+        self._grid = grid
+        self._m = m
+
+    def _index(self, n):
+        width = self._grid.width
+        if n < 0:
+            n += width
+        if not 0 <= n < width:
+            raise IndexError(f"column index out of range: {n}")
+        return n
+
+    def __getitem__(self, n):
+        grid = self._grid
+        width = grid._size[1]
+        if n.__class__ is int and 0 <= n < width and not grid._over: # 常见情况: 没有覆盖层时直接读底层存储
+            return _POINTS[grid._buf[self._m * width + n]]
+        if isinstance(n, slice):
+            return list(self)[n]
+        return _POINTS[grid._value(self._m, self._index(n))]
+
+    def __setitem__(self, n, value):
+        if n.__class__ is not int or not 0 <= n < self._grid._size[1]:
+            n = self._index(n)
+        self._grid._write(self._m, n, value)
+
+    def __len__(self):
+        return self._grid.width
+
+    def __iter__(self):
+        return map(_POINTS.__getitem__, self._grid.row_bytes(self._m))
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class Grid(object):
+    '''紧凑的二维网格: 行优先的一维 bytearray(或 numpy uint8)，第 m 行第 n 列位于 m * width + n
+    每个格子仅占一个字节，同时支持 g[m][n] 的读写以兼容原来二维列表的用法
+    写入时同步维护起止点位置和各类格子的计数，查询均为 O(1)；直接修改 buf 后需调用 reindex
+    snapshot 得到的快照与原网格共享底层存储(只读)，各自的修改写入稀疏的覆盖层 {行: {列: 值}}，
+    覆盖行同样在快照间共享、修改时才复制，覆盖层超过格子数的 1/8 时才真正复制一份底层存储，
+    因此快照以及快照间的 diff 开销只与行数和修改量相关
+    version 为拓扑版本号，墙与非墙互相转换、起止点变化或 reindex 时加一，cached 据此缓存基于地图结构的计算结果
+    connectivity 返回随写入增量维护的连通分量索引，用于快速判断两点是否连通
+    track 之后通过 _Row/set 的写入会被记录，changes 按格子合并后取出，用于增量刷新视图
+    '''
+    BACKENDS = ("bytearray", "numpy")
+    MARKED = (Point.Start, Point.End) # 需要记录位置的特殊点
+    _rows = None # 按需创建并复用的行视图，快照和副本各自重新创建
+    def __init__(self, size, default = Point.Chan, buf = None, backend = "bytearray"):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"unknown grid backend: {backend}")
+        if backend == "numpy" and np is None:
+            raise ImportError("grid backend numpy requires numpy: pip install numpy")
+        self._size = tuple(size)
+        self._backend = backend
+        count = self._size[0] * self._size[1]
+        if buf is None:
+            buf = bytearray([default]) * count if backend == "bytearray" else np.full(count, int(default), dtype = np.uint8)
+        elif len(buf) != count:
+            raise ValueError(f"grid buffer length {len(buf)} mismatch size {self._size}")
+        self._buf = buf
+        self._over, self._owned = None, set() # 覆盖层 {行: {列: 值}} 及本网格独占(可直接修改)的覆盖行
+        self._over_n, self._shared = 0, False # 覆盖的格子数、底层存储是否共享
+        self._version, self._cache = -1, {} # 拓扑版本号及基于结构的缓存 {key: (version, value)}
+        self._journal = None # track 之后的修改记录 {下标: 值}
+        self.reindex()
+
+    @staticmethod
+    def from_rows(rows, backend = "bytearray"):
+        '''由二维列表构造，传入 Grid 时返回其快照'''
+        if isinstance(rows, Grid):
+            return rows.snapshot()
+        size = (len(rows), len(rows[0]))
+        buf = bytearray(chain.from_iterable(rows))
+        if backend == "numpy":
+            buf = np.frombuffer(buf, dtype = np.uint8).copy()
+        return Grid(size, buf = buf, backend = backend)
+
+    def __getitem__(self, m):
+        rows = self._rows
+        if rows is None:
+            rows = self._rows = [_Row(self, k) for k in range(self._size[0])]
+        try:
+            return rows[m]
+        except (IndexError, TypeError):
+            raise IndexError(f"row index out of range: {m}") from None
+
+    def __len__(self):
+        return self._size[0]
+
+    def __iter__(self):
+        return (self[m] for m in range(self._size[0]))
+
+    def __deepcopy__(self, memo):
+        g = Grid.__new__(Grid)
+        raw = self.tobytes()
+        g._size, g._backend = self._size, self._backend
+        g._buf = bytearray(raw) if self._backend == "bytearray" else np.frombuffer(raw, dtype = np.uint8).copy()
+        g._over, g._owned, g._over_n, g._shared = None, set(), 0, False
+        g._counts = self.counts()
+        g._marks = {v: set(idx) for v, idx in self._marks.items()}
+        g._version, g._cache = self._version, dict(self._cache)
+        g._conn = g._journal = None
+        return g
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_cache"], state["_conn"], state["_journal"] = {}, None, None # 缓存、索引和修改记录不随 pickle 保存
+        state.pop("_rows", None)
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault("_version", 0) # 兼容没有拓扑版本号的旧 pickle
+        state.setdefault("_cache", {})
+        state.setdefault("_conn", None)
+        state.setdefault("_journal", None)
+        self.__dict__.update(state)
+
+    def __repr__(self):
+        return f"Grid({self._size}, backend={self._backend!r})"
+
+    def snapshot(self):
+        '''写时复制的快照: 与当前网格共享底层存储，开销与已有的覆盖层大小成正比'''
+        if self._over is None:
+            self._over = {}
+        self._shared = True
+        g = Grid.__new__(Grid)
+        g._size, g._backend, g._buf = self._size, self._backend, self._buf
+        g._over, g._owned = dict(self._over), set()
+        self._owned = set() # 覆盖行此后由双方共享，再修改时各自复制
+        g._over_n, g._shared = self._over_n, True
+        g._counts = self.counts()
+        g._marks = {v: set(idx) for v, idx in self._marks.items()}
+        g._version, g._cache = self._version, dict(self._cache) # 快照时内容相同，缓存可以沿用
+        g._conn = g._journal = None # 连通分量索引需要随写入维护，快照按需重建；修改记录不随快照复制
+        return g
+
+    def _own(self):
+        # 独占底层存储: 复制共享的存储并合入覆盖层
+        if not self._shared:
+            return
+        buf, width = self._buf.copy(), self._size[1]
+        for m, row in self._over.items():
+            for n, value in row.items():
+                buf[m * width + n] = value
+        self._buf = buf
+        self._over, self._owned, self._over_n, self._shared = None, set(), 0, False
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def width(self):
+        return self._size[1]
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @property
+    def version(self):
+        return self._version
+
+    def cached(self, key, build):
+        '''返回 build(self) 的结果，拓扑版本号不变时直接复用上次的结果'''
+        hit = self._cache.get(key)
+        if hit is None or hit[0] != self._version:
+            hit = self._cache[key] = (self._version, build(self))
+        return hit[1]
+
+    def track(self, enable = True):
+        '''开始(enable 为 False 时停止并丢弃)记录之后的修改，由 changes 取出'''
+        if not enable:
+            self._journal = None
+        elif self._journal is None:
+            self._journal = {}
+
+    def changes(self):
+        '''取出并清空自上次调用以来的修改 [(m, n, 新值), ...]，同一格子多次修改只保留最后的值；未调用 track 时为空'''
+        if not self._journal:
+            return []
+        width, journal = self._size[1], self._journal
+        self._journal = {}
+        return [(i // width, i % width, _POINTS[v]) for i, v in journal.items()]
+
+    def connectivity(self):
+        '''连通分量索引，首次调用时构建，之后随写入增量维护'''
+        if self._conn is None:
+            self._conn = Connectivity(self)
+        return self._conn
+
+    @property
+    def buf(self):
+        '''行优先的一维存储，供算法按 m * width + n 直接索引(快照会先独占一份存储)'''
+        self._own()
+        return self._buf
+
+    def _value(self, m, n):
+        if self._over:
+            row = self._over.get(m)
+            if row is not None and n in row:
+                return row[n]
+        return self._buf[m * self._size[1] + n]
+
+    def get(self, m, n):
+        '''读取单个格子，不经过行视图，供算法在热路径中使用'''
+        if not self._over:
+            return _POINTS[self._buf[m * self._size[1] + n]]
+        return _POINTS[self._value(m, n)]
+
+    def set(self, m, n, value):
+        '''修改单个格子，不经过行视图，供算法在热路径中使用'''
+        self._write(m, n, value)
+
+    def _write(self, m, n, value):
+        i = m * self._size[1] + n
+        old = self._buf[i] if not self._over else self._value(m, n)
+        if old == value:
+            return
+        if self._shared:
+            row = self._over.get(m)
+            if m not in self._owned: # 覆盖行与其它快照共享，先复制
+                row = self._over[m] = {} if row is None else dict(row)
+                self._owned.add(m)
+            if value == self._buf[i]: # 改回了底层的值，直接移出覆盖层
+                del row[n]
+                self._over_n -= 1
+                if not row:
+                    del self._over[m]
+                    self._owned.discard(m)
+            else:
+                self._over_n += n not in row
+                row[n] = value
+        else:
+            self._buf[i] = value
+        counts, marks = self._counts, self._marks
+        if counts is not None:
+            counts[old] -= 1
+            counts[value] += 1
+        if old in marks:
+            marks[old].discard(i)
+            self._version += 1
+        if value in marks:
+            marks[value].add(i)
+            self._version += 1
+        if (old == _WALL) != (value == _WALL):
+            if value not in marks:
+                self._version += 1
+            if self._conn is not None:
+                self._conn._toggle(i, value != _WALL)
+        if self._journal is not None:
+            self._journal[i] = value
+        if self._shared and self._over_n > len(self._buf) >> 3:
+            self._own()
+
+    def reindex(self):
+        '''根据存储全量重建索引'''
+        raw = self.tobytes()
+        self._counts = [raw.count(v) for v in range(len(_POINTS))]
+        self._marks = {v: set(_find_all(raw, v)) for v in self.MARKED}
+        self._version += 1
+        self._conn = None # 连通分量索引在下次查询时重建
+
+    def positions(self, value):
+        '''起点/终点的坐标列表，按行优先排序'''
+        return [divmod(i, self._size[1]) for i in sorted(self._marks[value])]
+
+    def count(self, value):
+        '''某类格子的数量'''
+        return self._counts[value]
+
+    def counts(self):
+        '''各类格子的数量，下标为 Point 的值'''
+        return self._counts[:]
+
+    def row_bytes(self, m):
+        '''第 m 行的原始字节'''
+        width = self._size[1]
+        raw = bytes(self._buf[m * width:(m + 1) * width])
+        row = self._over.get(m) if self._over else None
+        if not row:
+            return raw
+        raw = bytearray(raw)
+        for n, value in row.items():
+            raw[n] = value
+        return bytes(raw)
+
+    def tobytes(self):
+        '''整个网格的原始字节(合入覆盖层，不改变存储的共享状态)'''
+        if not self._over:
+            return bytes(self._buf)
+        raw, width = bytearray(self._buf), self._size[1]
+        for m, row in self._over.items():
+            for n, value in row.items():
+                raw[m * width + n] = value
+        return bytes(raw)
+
+    def diff(self, other):
+        '''与 other 的差异 [(m, n, other 的值), ...]，共享底层存储时只需比较双方的覆盖层'''
+        if self._buf is other._buf:
+            mine, theirs, res = self._over or {}, other._over or {}, []
+            for m in sorted(mine.keys() | theirs.keys()):
+                a, b = mine.get(m, {}), theirs.get(m, {})
+                if a is b: # 共享同一覆盖行则跳过逐点比较
+                    continue
+                for n in sorted(a.keys() | b.keys()):
+                    v = other._value(m, n)
+                    if self._value(m, n) != v:
+                        res.append((m, n, _POINTS[v]))
+            return res
+        res = []
+        for m in range(self._size[0]):
+            mine, theirs = self.row_bytes(m), other.row_bytes(m)
+            if mine == theirs: # 整行相同则跳过逐点比较
+                continue
+            res.extend((m, n, _POINTS[v]) for n, (u, v) in enumerate(zip(mine, theirs)) if u != v)
+        return res
+
+    def tolist(self, raw = False):
+        '''转换为二维列表，raw 为 True 时成员为 int 而非 Point'''
+        rows = [list(self.row_bytes(m)) for m in range(self._size[0])]
+        if raw:
+            return rows
+        return [[_POINTS[p] for p in row] for row in rows]
+
+    def to_numpy(self):
+        '''返回 (height, width) 的 numpy 视图，修改视图即修改网格'''
+        if np is None:
+            raise ImportError("Grid.to_numpy requires numpy: pip install numpy")
+        arr = self.buf if self._backend == "numpy" else np.frombuffer(self.buf, dtype = np.uint8)
+        return arr.reshape(self._size)
+
+
+class Connectivity(object):
+    '''非墙格子的连通分量索引: 每个格子记录一个标签，标签之间用并查集合并，connected/component_size 近似 O(1)
+    初始时按行扫描连续的通道段，与上一行重叠的段合并；之后由 Grid 在墙与非墙转换时通知:
+    打通墙只需与相邻格子的分量合并；砌墙则从相邻的格子同时做 BFS，互相遇到即仍然连通，
+    先搜索完的一侧说明被切断，只给这一侧换上新标签，开销与较小的一侧成正比
+    '''
+    _RUN = re.compile(b"[^" + re.escape(bytes((Point.Wall, ))) + b"]+") # 一行中连续的非墙格子
+
+    def __init__(self, grid):
+        height, width = grid.size
+        self._size = (height, width)
+        raw = grid.tobytes()
+        self._open = bytearray(raw.translate(bytes(int(v != Point.Wall) for v in range(256))))
+        self._label = label = array('i', [-1]) * (height * width)
+        self._parent, self._count = [], [] # 标签的并查集及根标签对应分量的格子数
+        prev = []
+        for m in range(height):
+            runs, k = [], 0
+            for r in self._RUN.finditer(raw, m * width, (m + 1) * width):
+                a, b = r.span()
+                l = self._new_label(b - a)
+                label[a:b] = array('i', [l]) * (b - a)
+                while k < len(prev) and prev[k][1] <= a - width: # 上一行中与当前段重叠的段
+                    k += 1
+                j = k
+                while j < len(prev) and prev[j][0] < b - width:
+                    self._union(l, prev[j][2])
+                    j += 1
+                runs.append((a, b, l))
+            prev = runs
+
+    def _new_label(self, count):
+        self._parent.append(len(self._parent))
+        self._count.append(count)
+        return len(self._parent) - 1
+
+    def _find(self, l):
+        parent = self._parent
+        while parent[l] != l:
+            parent[l] = parent[parent[l]]
+            l = parent[l]
+        return l
+
+    def _union(self, a, b):
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return a
+        if self._count[a] < self._count[b]:
+            a, b = b, a
+        self._parent[b] = a
+        self._count[a] += self._count[b]
+        return a
+
+    def _neighbours(self, i):
+        height, width = self._size
+        col, res = i % width, []
+        for j in (i - width if i >= width else -1, i + width if i + width < height * width else -1,
+                  i - 1 if col > 0 else -1, i + 1 if col < width - 1 else -1):
+            if j >= 0 and self._open[j]:
+                res.append(j)
+        return res
+
+    def _toggle(self, i, passable):
+        # 格子 i 在墙与非墙之间切换
+        self._open[i] = passable
+        near = self._neighbours(i)
+        if passable:
+            l = self._new_label(1)
+            for j in near:
+                l = self._union(l, self._label[j])
+            self._label[i] = l
+            return
+        self._count[self._find(self._label[i])] -= 1
+        self._label[i] = -1
+        if len(near) > 1:
+            self._split(near)
+
+    def _split(self, near):
+        # 从砌墙处相邻的格子同时 BFS，已完成且未与其它搜索相遇的一侧换上新标签
+        root = self._find(self._label[near[0]])
+        owner = {j: k for k, j in enumerate(near)}
+        group = list(range(len(near))) # 搜索之间的合并关系
+        queues = [deque([j]) for j in near]
+        found = [[j] for j in near]
+
+        def top(k):
+            while group[k] != k:
+                k = group[k]
+            return k
+
+        while True:
+            alive = set(top(k) for k, q in enumerate(queues) if q)
+            if len(alive) <= 1: # 最多只剩一侧还在搜索，其余各侧都已被切断
+                break
+            for k, q in enumerate(queues):
+                if not q:
+                    continue
+                for j in self._neighbours(q.popleft()):
+                    o = owner.get(j)
+                    if o is None:
+                        owner[j] = k
+                        q.append(j)
+                        found[k].append(j)
+                    elif top(o) != top(k): # 两侧相遇，仍然连通
+                        group[top(o)] = top(k)
+        sides = {}
+        for k in range(len(near)):
+            sides.setdefault(top(k), []).extend(found[k])
+        keep = alive.pop() if alive else max(sides, key = lambda g: len(sides[g])) # 未搜索完的一侧保留原标签
+        for g, cells in sides.items():
+            if g == keep:
+                continue
+            l = self._new_label(len(cells))
+            self._count[root] -= len(cells)
+            for j in cells:
+                self._label[j] = l
+
+    def connected(self, a, b):
+        '''a 和 b 是否都是非墙格子且相互连通'''
+        width = self._size[1]
+        la, lb = self._label[a[0] * width + a[1]], self._label[b[0] * width + b[1]]
+        return la >= 0 and lb >= 0 and self._find(la) == self._find(lb)
+
+    def component_size(self, p):
+        '''p 所在连通分量的格子数，墙返回 0'''
+        l = self._label[p[0] * self._size[1] + p[1]]
+        return self._count[self._find(l)] if l >= 0 else 0
+
+    def component_sizes(self):
+        '''所有连通分量的格子数，从大到小排列'''
+        return sorted((c for l, c in enumerate(self._count) if self._parent[l] == l and c > 0), reverse = True)
+
+
+def _row_stride(width, bits):
+    '''每行按 8 个格子对齐后的字节数'''
+    return (width + 7) // 8 * bits
+
+
+def _encode_row(row, bits):
+    '''将一行原始字节压缩为 bits 位每格的定长字节串'''
+    stride = _row_stride(len(row), bits)
+    digits = row.translate(_BIT1_ENC if bits == 1 else _BIT3_ENC)
+    digits += b"0" * (stride * 8 // bits - len(row))
+    return int(digits, 2 if bits == 1 else 8).to_bytes(stride, "big")
+
+
+def _decode_row(chunk, bits, width):
+    '''_encode_row 的逆过程，返回一行原始字节'''
+    count = len(chunk) * 8 // bits
+    digits = format(int.from_bytes(chunk, "big"), f"0{count}{'b' if bits == 1 else 'o'}")[:width]
+    return digits.encode().translate(_BIT1_DEC if bits == 1 else _BIT3_DEC)
+
+
+class MappedGrid(Grid):
+    '''基于 mmap 的二进制地图网格，首次访问某一行时才解码该行，全部解码后释放 mmap'''
+    def __init__(self, size, mm, offset, bits, marks):
+        self._size, self._backend = tuple(size), "bytearray"
+        self._buf = bytearray(self._size[0] * self._size[1])
+        self._over, self._owned, self._over_n, self._shared = None, set(), 0, False
+        self._version, self._cache, self._conn, self._journal = 0, {}, None, None
+        self._mm = mm
+        self._offset = offset
+        self._bits = bits
+        self._stride = _row_stride(self._size[1], bits)
+        self._fill = marks if bits == 1 else {} # {row: [(col, Point), ...]} 1位编码时需要恢复的起止点
+        self._pending = self._size[0] # 尚未解码的行数
+        self._loaded = bytearray(self._size[0])
+        self._counts = None # 计数在全部解码后再统计
+        self._marks = {v: set() for v in self.MARKED} # 起止点直接取自文件头
+        for row, items in marks.items():
+            for n, value in items:
+                self._marks[value].add(row * self._size[1] + n)
+
+    def _ensure(self, m):
+        if self._pending == 0 or self._loaded[m]:
+            return
+        width, start = self._size[1], self._offset + m * self._stride
+        row = _decode_row(self._mm[start:start + self._stride], self._bits, width)
+        self._buf[m * width:(m + 1) * width] = row
+        for n, value in self._fill.get(m, ()):
+            self._buf[m * width + n] = value
+        self._loaded[m] = 1
+        self._pending -= 1
+        if self._pending == 0:
+            self._mm.close()
+            raw = bytes(self._buf)
+            self._counts = [raw.count(v) for v in range(len(_POINTS))]
+
+    def _ensure_all(self):
+        for m in range(self._size[0]):
+            self._ensure(m)
+
+    def __getitem__(self, m):
+        row = super().__getitem__(m)
+        self._ensure(row._m)
+        return row
+
+    def __iter__(self):
+        for m in range(self._size[0]):
+            yield self[m]
+
+    def __deepcopy__(self, memo):
+        self._ensure_all()
+        return super().__deepcopy__(memo)
+
+    def __reduce__(self):
+        return (Grid, (self._size, 0, bytearray(self.tobytes()), self._backend))
+
+    def snapshot(self):
+        self._ensure_all()
+        return super().snapshot()
+
+    @property
+    def buf(self):
+        self._ensure_all()
+        return super().buf
+
+    def tobytes(self):
+        self._ensure_all()
+        return super().tobytes()
+
+    def get(self, m, n):
+        self._ensure(m)
+        return super().get(m, n)
+
+    def set(self, m, n, value):
+        self._ensure(m)
+        super().set(m, n, value)
+
+    def row_bytes(self, m):
+        self._ensure(m)
+        return super().row_bytes(m)
+
+    def count(self, value):
+        self._ensure_all()
+        return super().count(value)
+
+    def counts(self):
+        self._ensure_all()
+        return super().counts()
+
+
+class MapWriter(object):
+    '''逐行写入地图文件(binary/json)，内存只与宽度相关，用于流式生成超大迷宫
+    binary 格式在关闭时回写实际高度；1位编码只能写入墙、通道和起止点(起止点由文件头恢复)
+    '''
+    _BIT1_VALUES = bytes((Point.Chan, Point.Wall, Point.Start, Point.End))
+    def __init__(self, path, width, starts = (), ends = (), fmt = "binary", bits = 1):
+        if fmt not in ("json", "binary"):
+            raise ValueError(f"unknown map format: {fmt}")
+        if bits not in (1, 3):
+            raise ValueError(f"unsupported bits per cell: {bits}")
+        self._width, self._fmt, self._bits, self._height = width, fmt, bits, 0
+        self._starts, self._ends = list(starts), list(ends)
+        self._f = open(path, "wb")
+        if fmt == "binary":
+            self._f.write(self._header())
+            self._f.write(b"".join(_COORD.pack(*p) for p in self._starts + self._ends))
+        else:
+            self._f.write(b'{"data": [')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _header(self):
+        return _HEADER.pack(_MAGIC, _VERSION, self._bits, self._height, self._width, len(self._starts), len(self._ends))
+
+    @property
+    def height(self):
+        '''已写入的行数'''
+        return self._height
+
+    def write(self, row):
+        '''写入一行原始字节(或 Point 列表)'''
+        row = bytes(row)
+        if len(row) != self._width:
+            raise ValueError(f"row length {len(row)} mismatch width {self._width}")
+        if self._fmt == "json":
+            self._f.write((b", " if self._height else b"") + json.dumps(list(row)).encode())
+        elif self._bits == 1 and row.translate(None, self._BIT1_VALUES):
+            raise ValueError("1 bit encoding only supports Chan/Wall/Start/End")
+        else:
+            self._f.write(_encode_row(row, self._bits))
+        self._height += 1
+
+    def close(self):
+        if self._f.closed:
+            return
+        if self._fmt == "binary":
+            self._f.seek(0)
+            self._f.write(self._header())
+        else:
+            self._f.write(b"]}")
+        self._f.close()
 
 
 class Map(object):
     '''地图对象: 支持创建、修改成员、保存、加载'''
-    def __init__(self, size = (10, 10), default = Point.Chan, *args, **kwargs):
+    def __init__(self, size = (10, 10), default = Point.Chan, backend = "bytearray", *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._size = size
-        self._data = [[default for _ in range(self._size[1])] for _ in range(self._size[0])]
+        self._size = tuple(size)
+        self._data = Grid(self._size, default, backend = backend)
 
     def __str__(self):
-        # mtx = '\n'.join([' '.join([f"{p.value}" for p in row]) for row in self._data])
-        mtx = '\n'.join([' '.join([p.name[0] for p in row]) for row in self._data])
+        mtx = '\n'.join([' '.join(self._data.row_bytes(m).translate(_NAMES).decode()) for m in range(self._size[0])])
         return f"{self._size[1]}X{self._size[0]}:\n{mtx}"
 
+    def __setstate__(self, state):
+        # 兼容旧版本 pickle 保存的二维列表数据
+        if isinstance(state.get("_data"), list):
+            state["_data"] = Grid.from_rows(state["_data"])
+        self.__dict__.update(state)
+
     def from_data(self, data):
-        self._size = (len(data), len(data[0]))
-        self._data = copy.deepcopy(data)
+        self._data = Grid.from_rows(data)
+        self._size = self._data.size
         return self
 
     def diff(self, other): # different from __sub__ witch return Map
@@ -73,11 +773,7 @@ class Map(object):
         if self._size != other.size:
             print(f"Map diff with different size: {self.size} != {other.size}")
             return res
-        for m in range(self._size[0]):
-            for n in range(self._size[1]):
-                if self._data[m][n] != other.data[m][n]:
-                    res.append((m, n, other.data[m][n]))
-        return res
+        return self._data.diff(other.data)
 
     @property # avoid modify data use m.data = Point.Wall, can use as m.data[1][1] = Point.Wall
     def data(self):
@@ -89,37 +785,104 @@ class Map(object):
 
     @property
     def start(self):
-        res = []
-        for m in range(self._size[0]):
-            for n in range(self._size[1]):
-                if self._data[m][n] == Point.Start:
-                    res.append((m, n))
-        return res
+        return self._data.positions(Point.Start)
 
     @property
     def end(self):
-        res = []
-        for m in range(self._size[0]):
-            for n in range(self._size[1]):
-                if self._data[m][n] == Point.End:
-                    res.append((m, n))
-        return res
+        return self._data.positions(Point.End)
 
-    def save(self, path):
+    def get(self, m, n):
+        return self._data.get(m, n)
+
+    def set(self, m, n, value):
+        '''修改单个格子，同步维护起止点索引和计数'''
+        self._data.set(m, n, value)
+
+    def count(self, value):
+        '''某类格子的数量，如已访问点 Point.Visited 的个数'''
+        return self._data.count(value)
+
+    def connected(self, a, b):
+        '''a 和 b 是否连通(非墙的格子均可通行)，由增量维护的连通分量索引回答'''
+        return self._data.connectivity().connected(a, b)
+
+    def component_size(self, p):
+        '''p 所在连通分量的格子数，墙返回 0'''
+        return self._data.connectivity().component_size(p)
+
+    def save(self, path, fmt = "pickle"):
+        '''保存地图，fmt 可选 pickle/json/binary，其中 binary 为位压缩格式，体积最小且支持 mmap 按需加载'''
+        if fmt not in ("pickle", "json", "binary"):
+            raise ValueError(f"unknown map format: {fmt}")
+        # 先在内存中序列化再打开文件: 按需加载的地图此时才全部解码并释放 mmap，因此可以保存回加载时的文件
+        if fmt == "pickle":
+            raw = pickle.dumps(self)
+        elif fmt == "json":
+            raw = self.to_json().encode()
+        else:
+            raw = self.to_binary()
         with open(path, "wb") as f:
-            s = pickle.dumps(self)
-            f.write(s)
+            f.write(raw)
 
     @staticmethod
-    def load(path):
+    def load(path, allow_pickle = True):
+        '''加载地图，根据文件内容自动识别 binary/json/pickle 格式，json 无效时返回 None
+        pickle 可以执行任意代码，加载不可信的文件时应设置 allow_pickle 为 False，此时其它内容抛出 ValueError
+        '''
         with open(path, "rb") as f:
+            head = f.read(len(_MAGIC))
+            if head == _MAGIC:
+                return Map._load_binary(f)
+            f.seek(0)
             s = f.read()
-            m = pickle.loads(s)
-            return m
+        if s.lstrip()[:1] == b"{":
+            m, ok = Map.from_json(s.decode())
+            return m if ok else None
+        if not allow_pickle:
+            raise ValueError(f"not a binary or json map file: {path}")
+        return pickle.loads(s)
+
+    def to_binary(self):
+        '''序列化为二进制格式: 仅含墙和通道(及起止点)时每格1位，否则每格3位'''
+        height, width = self._size
+        starts, ends = self.start, self.end
+        raw = self._data.tobytes()
+        bits = 1 if raw.translate(None, bytes((Point.Chan, Point.Wall, Point.Start, Point.End))) == b"" else 3
+        parts = [_HEADER.pack(_MAGIC, _VERSION, bits, height, width, len(starts), len(ends))]
+        parts.extend(_COORD.pack(*p) for p in starts + ends)
+        parts.extend(_encode_row(raw[m * width:(m + 1) * width], bits) for m in range(height))
+        return b"".join(parts)
+
+    @staticmethod
+    def _load_binary(f):
+        f.seek(0)
+        mm = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        if len(mm) < _HEADER.size:
+            mm.close()
+            raise ValueError("map file is truncated")
+        magic, version, bits, height, width, nstarts, nends = _HEADER.unpack_from(mm, 0)
+        if version != _VERSION or bits not in (1, 3):
+            mm.close()
+            raise ValueError(f"unsupported map file version {version} with {bits} bits encoding")
+        offset, marks = _HEADER.size, {}
+        if len(mm) < offset + (nstarts + nends) * _COORD.size + height * _row_stride(width, bits): # 按需解码前先检查长度，避免解码出不完整的行
+            mm.close()
+            raise ValueError("map file is truncated")
+        for i in range(nstarts + nends):
+            row, col = _COORD.unpack_from(mm, offset)
+            offset += _COORD.size
+            if not (row < height and col < width):
+                mm.close()
+                raise ValueError(f"map file point out of range: {(row, col)}")
+            marks.setdefault(row, []).append((col, Point.Start if i < nstarts else Point.End))
+        m = Map.__new__(Map)
+        m._size = (height, width)
+        m._data = MappedGrid(m._size, mm, offset, bits, marks)
+        return m
 
     def to_json(self):
         txt = json.dumps({
-            "data": self._data
+            "data": self._data.tolist(raw = True)
             })
         return txt
 
@@ -130,9 +893,13 @@ class Map(object):
         if not all([p in values for row in dic["data"] for p in row]): # 确保所有值都是有效Point
             print(f"json value is not valid Point: {dic['data']}")
             return None, False
-        data = [[Point(p) for p in row] for row in dic["data"]]
-        return Map().from_data(data), True
+        return Map().from_data(dic["data"]), True
 
+    def snapshot(self):
+        '''写时复制的快照，代替 copy.deepcopy 用于频繁复制的场景'''
+        m = Map.__new__(Map)
+        m._size, m._data = self._size, self._data.snapshot()
+        return m
 
 if __name__ == '__main__':
     import doctest
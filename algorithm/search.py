@@ -5,7 +5,8 @@
 # @Link    : https://github.com/HeLiangHIT
 # 此处r主要是为了支持在 doctest 命令中使用 \n
 r'''
-路径搜索，提供bfs(最短路)和dfs两种方法，入参相同，使用示例如下:
+路径搜索，提供bfs(最短路)、bibfs(双向最短路)、dfs和a_star(最短路)几种方法，入参相同，各有分步执行的 xxx_steps 版本(见 events 模块)，
+另有按地图缓存的距离场、批量查询和增量最短路，使用示例如下:
 >>> m = Map((3, 3)); m.data[1][1] = Point.Wall; m.data[0][0] = Point.Start; m.data[1][2] = Point.End
 >>> paths = bfs(m.data, [(0, 0),], [(1, 2),], callback=lambda m: print('\n'.join(["-----", ] + [' '.join([p.name[0] for p in row]) for row in m]))) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
 -----
@@ -26,6 +27,22 @@ V V N
 >>> print(paths) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
 [[(0, 0), (0, 1), (0, 2), (1, 2)]]
 
+>>> paths = bibfs(m.data, [(0, 0),], [(1, 2),], callback=lambda m: print('\n'.join(["-----", ] + [' '.join([p.name[0] for p in row]) for row in m]))) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+-----
+V C C
+C W E
+C C C
+-----
+V N C
+N W V
+C C C
+...
+V V N
+V W V
+N C N
+>>> print(paths) # 双向BFS，起点和终点两侧的波前同时扩展
+[[(0, 0), (0, 1), (0, 2), (1, 2)]]
+
 >>> paths = dfs(m.data, [(0, 0),], [(1, 2),], callback=lambda m: print('\n'.join(["-----", ] + [' '.join([p.name[0] for p in row]) for row in m]))) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
 -----
 V C C
@@ -42,6 +59,8 @@ V W V
 V V V
 >>> print(paths) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
 [[(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (1, 2)]]
+>>> dfs(m.data, [(0, 0),], [(1, 2), (2, 0)], max_paths=2) # 找到目标后回溯继续搜索其他目标
+[[(0, 0), (1, 0), (2, 0)], [(0, 0), (0, 1), (0, 2), (1, 2)]]
 >>> paths = a_star(m.data, [(0, 0),], [(1, 2),], callback=lambda m: print('\n'.join(["-----", ] + [' '.join([p.name[0] for p in row]) for row in m]))) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
 -----
 V C C
@@ -55,22 +74,74 @@ N W V
 C C C
 >>> print(paths) # doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
 [[(0, 0), (0, 1), (0, 2), (1, 2)]]
+>>> f = DistanceField.of(m.data); print(f.distance((0, 0)), f.next_step((0, 0)), f.path((2, 0))) # 到终点的距离场，按地图缓存
+3 (0, 1) [(2, 0), (2, 1), (2, 2), (1, 2)]
+>>> DistanceField.of(m.data) is f
+True
+>>> m = Map((20, 20)); frames = []; paths = a_star(m.data, [(0, 0),], [(19, 19),], callback=frames.append)
+>>> print(len(paths[0]), len(frames)) # A* 为最短路，且空旷地图上只访问路径上的点
+39 39
+>>> m = Map((3, 4), default = Point.Wall); planner = LPAStar(m.data, (0, 0), (2, 3)) # 增量最短路，适合逐个格子编辑地图
+>>> for p in [(0, 0), (0, 1), (0, 2), (0, 3), (1, 3), (2, 3)]: planner.update(p, Point.Chan)
+>>> print(planner.distance, planner.path())
+5 [(0, 0), (0, 1), (0, 2), (0, 3), (1, 3), (2, 3)]
+>>> planner.update((0, 2), Point.Wall); print(planner.distance) # 堵住后不可达
+-1
+>>> for p in [(1, 0), (2, 0), (2, 1), (2, 2)]: planner.update(p, Point.Chan)
+>>> print(planner.distance, planner.path()) # 只修复受影响的格子
+5 [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (2, 3)]
+>>> m = Map((3, 3)); m.data[1][1] = Point.Wall; solver = Solver.of(m.data) # 同一张地图上的批量查询，终点相同的查询共用一次 BFS
+>>> for path in solver.solve_many([((0, 0), (2, 2)), ((0, 1), (2, 2)), ((1, 1), (2, 2)), ((2, 0), (2, 0))]): print(path)
+[(0, 0), (0, 1), (0, 2), (1, 2), (2, 2)]
+[(0, 1), (0, 2), (1, 2), (2, 2)]
+[]
+[(2, 0), (2, 0)]
 '''
-import sys
 import os
 import copy
+import heapq
 import traceback
-from queue import PriorityQueue
-from .map import Point, Map
+from array import array
+from collections import deque
+from .map import Point, Map, Grid
+from .events import drive
+
+
+_OPEN = bytes(int(v != Point.Wall) for v in range(256)) # 格子值 -> 是否可通行
+
+
+class _PaddedGrid(object):
+    '''四周补一圈墙后的可通行表，供在同一张地图上反复搜索的类继承
+    _cells 为一维 bytearray(行宽 _stride = width + 2)，1 表示可通行(非墙)，_offsets 为上下左右的下标偏移，访问相邻格子不需要判断边界
+    '''
+    def __init__(self, grid):
+        height, width = grid.size
+        stride = width + 2
+        raw = grid.tobytes().translate(_OPEN)
+        cells = bytearray(stride * (height + 2))
+        for m in range(height):
+            cells[(m + 1) * stride + 1:(m + 1) * stride + 1 + width] = raw[m * width:(m + 1) * width]
+        self._stride, self._cells, self._offsets = stride, cells, (-stride, stride, -1, 1)
+
+    def _pid(self, p):
+        '''格子坐标 -> 补墙后的一维下标'''
+        return (p[0] + 1) * self._stride + p[1] + 1
+
+    def _coord(self, j):
+        '''补墙后的一维下标 -> 格子坐标'''
+        m, n = divmod(j, self._stride)
+        return (m - 1, n - 1)
 
 
 def _valid_check(mdata, srcs, targets):
     '''输入有效性检查'''
-    if not (isinstance(mdata, list) and isinstance(mdata[0], list)):
+    if isinstance(mdata, Grid): # 紧凑网格的成员在写入时即为有效 Point
+        pass
+    elif not (isinstance(mdata, list) and isinstance(mdata[0], list)):
         print(f"input parameter mdata is illegal(must be 2-dimension): {mdata}")
         traceback.print_stack()
         return False
-    if not all([isinstance(p, Point) for row in mdata for p in row]): # 所有成员都是 Point 子类
+    elif not all([isinstance(p, Point) for row in mdata for p in row]): # 所有成员都是 Point 子类
         print(f"input parameter mdata is illegal(must be all Point type): {mdata}")
         traceback.print_stack()
         return False
@@ -86,54 +157,82 @@ def _valid_check(mdata, srcs, targets):
     return True
 
 
-def _backtrace(pre_points, srcs, cur):
-    '''回溯从srcs到cur的路径'''
+def _working_copy(mdata):
+    '''算法内部修改用的副本: Grid 使用写时复制的快照，二维列表则深拷贝'''
+    return mdata.snapshot() if isinstance(mdata, Grid) else copy.deepcopy(mdata)
+
+
+def _flat_cells(mdata):
+    '''地图的一维可写字节副本，第 m 行第 n 列位于 m * width + n'''
+    if isinstance(mdata, Grid):
+        return bytearray(mdata.tobytes())
+    return bytearray(p for row in mdata for p in row)
+
+
+def _backtrace(pre, src_set, cur, width):
+    '''回溯从srcs到cur的路径，pre 为一维下标的前序数组(-1 表示没有前序)'''
     path = [cur, ]
-    if cur not in pre_points: # 当前点(目标点)和起始点重复的特殊情况
-        path.append(cur)
-        return path[::-1]
-    while pre_points[cur] not in srcs: # 遍历找到从源到当前点的路径
-        cur = pre_points[cur]
+    if pre[cur] == -1: # 当前点(目标点)和起始点重复的特殊情况
         path.append(cur)
-    path.append(pre_points[cur])
-    return path[::-1]
+    else:
+        while pre[cur] not in src_set: # 遍历找到从源到当前点的路径
+            cur = pre[cur]
+            path.append(cur)
+        path.append(pre[cur])
+    return [divmod(i, width) for i in reversed(path)]
 
 
-def bfs(mdata, srcs, targets, max_steps = 20000, max_paths = 1, callback = None):
-    r'''
-    多点对多点的BFS最短路算法
-    NOTE: mdata 为二维数组，入参 srcs 和 targets 需为数组实际下标； callback 为每次迭代计算的回调，用于实时在视图中刷新访问情况
+def _search(mdata, srcs, targets, max_steps, max_paths, visible, cost = None):
+    '''bfs/a_star 共用的搜索内核，格子使用一维下标，前序使用 array('i')，每个格子最多入队一次，整体为线性复杂度
+    cost 为 None 时待访问队列为先进先出的 deque(BFS)，否则为 heapq，按 cost(下标) 从小到大出队、相同时下标小的先出
+    出队时标记为 Visited，入队时标记为 NxtVisit；只有 visible 时才写入地图副本并产出(每出队一个格子产出一次)
     '''
-    if not _valid_check(mdata, srcs, targets):
-        return []
-    width = len(mdata[0]) # 注意数组的保存是从上到下、从左到右
-    height = len(mdata)
-    _mdata = copy.deepcopy(mdata) # 避免直接修改实参
-    
-    q = srcs[:] # 待探索的点，避免直接修改实参
-    avaliable_paths = [] # 可达结果路径列表
-    targets_set = set(targets) # 避免目标重复和直接修改实参
+    height, width = len(mdata), len(mdata[0]) # 注意数组的保存是从上到下、从左到右
+    size = height * width
+    cells = _flat_cells(mdata)
+    view = _working_copy(mdata) if visible else None # 避免直接修改实参
+    passable = bytearray(256) # 可以进入的格子，NOTE: 终点也可选
+    passable[Point.Chan] = passable[Point.End] = 1
+    is_target = bytearray(size)
+    for p in targets:
+        is_target[p[0] * width + p[1]] = 1
+    src_ids = [p[0] * width + p[1] for p in srcs]
+    src_set = set(src_ids)
+    pre = array('i', [-1]) * size # 前序索引，用于回溯
 
-    steps = 0 # 计算次数，避免超时
-    pre_points = {} # 前序索引，用于回溯
+    if cost is None:
+        q = deque(src_ids) # 待探索的点
+        pop, push = q.popleft, q.append
+    else:
+        q = [(0, i) for i in src_ids]
+        heapq.heapify(q)
+        pop = lambda: heapq.heappop(q)[1]
+        push = lambda i: heapq.heappush(q, (cost(i), i))
 
-    while q and targets_set:
-        cur, *q = q
+    avaliable_paths = [] # 可达结果路径列表
+    steps = 0 # 计算次数，避免超时
+    while q:
+        cur = pop()
         steps += 1
-        _mdata[cur[0]][cur[1]] = Point.Visited
-        if callback is not None:
-            callback(_mdata)
-        if cur in targets_set: # 找到目标
-            avaliable_paths.append(_backtrace(pre_points, srcs, cur)) # 保存最短路径
-            # targets_set.remove(cur) # 移除目标，此处无需移除，允许下一条路径到达该目标
-        else: # 非目标节点，增加相邻的合法节点
-            udlr = [(cur[0] - 1, cur[1]), (cur[0] + 1, cur[1]), (cur[0], cur[1] - 1), (cur[0], cur[1] + 1),]
-            qadd = [p for p in udlr if 0 <= p[0] < height and 0 <= p[1] < width and _mdata[p[0]][p[1]] in (Point.Chan, Point.End)] # NOTE: 终点也可选
-            for p in qadd: # 记录目标点是从当前位置过去的
-                _mdata[p[0]][p[1]] = Point.NxtVisit # 已经走过，设置即将访问的点避免再次被加入访问队列
-                if p not in pre_points: # 增加标记前进路线，避免重复增加
-                    pre_points[p] = cur
-            q.extend(qadd)
+        cells[cur] = Point.Visited
+        if view is not None:
+            view[cur // width][cur % width] = Point.Visited
+            yield view
+        if is_target[cur]: # 找到目标
+            avaliable_paths.append(_backtrace(pre, src_set, cur, width)) # 保存最短路径
+            # 此处无需移除目标，允许下一条路径到达该目标
+        else: # 非目标节点，增加相邻的合法节点(上下左右)
+            col = cur % width
+            for p in (cur - width if cur >= width else -1, cur + width if cur + width < size else -1,
+                      cur - 1 if col > 0 else -1, cur + 1 if col < width - 1 else -1):
+                if p < 0 or not passable[cells[p]]:
+                    continue
+                cells[p] = Point.NxtVisit # 已经走过，设置即将访问的点避免再次被加入访问队列
+                if view is not None:
+                    view[p // width][p % width] = Point.NxtVisit
+                if pre[p] == -1: # 记录目标点是从当前位置过去的
+                    pre[p] = cur
+                push(p)
         if len(avaliable_paths) >= max_paths:
             break
         if steps >= max_steps:
@@ -141,98 +240,246 @@ def bfs(mdata, srcs, targets, max_steps = 20000, max_paths = 1, callback = None)
     return avaliable_paths
 
 
-def _dfs(mdata, cur, targets, iter_status, max_steps, max_paths, callback):
-    width = len(mdata[0]) # 注意数组的保存是从上到下、从左到右
-    height = len(mdata)
-
-    pre = mdata[cur[0]][cur[1]]
-    mdata[cur[0]][cur[1]] = Point.Visited
-    iter_status["steps"] += 1
-    iter_status["cur_path"].append(cur)
-
-    # 边界条件
-    if len(iter_status["avaliable_paths"]) >= max_paths or iter_status["steps"] >= max_steps:
-        return False
-    if callback is not None:
-        callback(mdata)
-    if cur in targets:
-        iter_status["avaliable_paths"].append(iter_status["cur_path"][:])
-        return True
+def bfs(mdata, srcs, targets, max_steps = 20000, max_paths = 1, callback = None):
+    r'''
+    多点对多点的BFS最短路算法
+    NOTE: mdata 为二维数组，入参 srcs 和 targets 需为数组实际下标； callback 为每次迭代计算的回调，用于实时在视图中刷新访问情况
+    '''
+    return drive(bfs_steps(mdata, srcs, targets, max_steps, max_paths, visible = callback is not None), callback)
 
-    udlr = [(cur[0] - 1, cur[1]), (cur[0] + 1, cur[1]), (cur[0], cur[1] - 1), (cur[0], cur[1] + 1),]
-    qadd = [p for p in udlr if 0 <= p[0] < height and 0 <= p[1] < width and mdata[p[0]][p[1]] in (Point.Chan, Point.End)]
-    for p in qadd:
-        _dfs(mdata, p, targets, iter_status, max_steps, max_paths, callback)
 
-    iter_status["cur_path"].remove(cur)
-    mdata[cur[0]][cur[1]] = pre
+def bfs_steps(mdata, srcs, targets, max_steps = 20000, max_paths = 1, visible = True):
+    '''bfs 的分步版本: 每访问一个格子产出一次地图副本，结束时的返回值(StopIteration.value)为路径列表；visible 为 False 时不产出，直接运行到结束'''
+    if not _valid_check(mdata, srcs, targets):
+        return []
+    return (yield from _search(mdata, srcs, targets, max_steps, max_paths, visible))
 
 
-def dfs(mdata, srcs, targets, max_steps = 50000, max_paths = 1, callback = None):
+def bibfs(mdata, srcs, targets, max_steps = 20000, max_paths = 1, callback = None):
     '''
-    多点对多点的DFS最短路算法
+    双向BFS最短路算法，适合单个起点到单个终点的查询
     NOTE: mdata 为二维数组，入参 srcs 和 targets 需为数组实际下标； callback 为每次迭代计算的回调，用于实时在视图中刷新访问情况
+    从起点和终点同时按层扩展，每次扩展当前层较小的一侧，两侧相遇时拼接路径；两侧的搜索半径约为单向BFS的一半
+    出队时标记为 Visited，入队时标记为 NxtVisit，回调中可以同时看到两侧的波前；max_paths > 1 时退化为 bfs
     '''
-    pre_stack_limit = sys.getrecursionlimit()
-    sys.setrecursionlimit(10000)
-    if not _valid_check(mdata, srcs, targets):
-        return []
-    _mdata = copy.deepcopy(mdata) # 避免直接修改实参
-    iter_status = {"steps": 0, # 访问步数
-                   "cur_path": [], # 当前访问路径
-                   "avaliable_paths": [], # 可达结果路径列表
-                  }
+    return drive(bibfs_steps(mdata, srcs, targets, max_steps, max_paths, visible = callback is not None), callback)
 
-    for p in srcs:
-        _dfs(_mdata, p, targets, iter_status, max_steps, max_paths, callback)
 
-    sys.setrecursionlimit(pre_stack_limit)
-    return iter_status["avaliable_paths"]
+def bibfs_steps(mdata, srcs, targets, max_steps = 20000, max_paths = 1, visible = True):
+    '''bibfs 的分步版本: 每访问一个格子产出一次地图副本，结束时的返回值(StopIteration.value)为路径列表；visible 为 False 时不产出，直接运行到结束'''
+    if not _valid_check(mdata, srcs, targets):
+        return []
+    if max_paths > 1:
+        return (yield from bfs_steps(mdata, srcs, targets, max_steps, max_paths, visible))
+    height, width = len(mdata), len(mdata[0]) # 注意数组的保存是从上到下、从左到右
+    size = height * width
+    cells = _flat_cells(mdata)
+    view = _working_copy(mdata) if visible else None # 避免直接修改实参
+    passable = bytearray(256) # 可以进入的格子，NOTE: 终点也可选
+    passable[Point.Chan] = passable[Point.End] = 1
+    side = bytearray(size) # 0: 未到达，1: 起点一侧，2: 终点一侧
+    pre = (None, array('i', [-1]) * size, array('i', [-1]) * size) # 两侧各自的前序索引
+    frontier = [None, [], []]
+    for k, points in ((1, srcs), (2, targets)):
+        for p in points:
+            i = p[0] * width + p[1]
+            if side[i] == 3 - k: # 起点和终点重复的特殊情况
+                return [[p, p]]
+            if not side[i]:
+                side[i] = k
+                frontier[k].append(i)
 
+    steps = 0 # 计算次数，避免超时
+    meet = None # 路径最短的相遇点 (起点一侧的格子, 终点一侧的格子)
+    while frontier[1] and frontier[2] and meet is None:
+        k = 1 if len(frontier[1]) <= len(frontier[2]) else 2 # 扩展较小的一侧
+        other, prek, layer, frontier[k] = 3 - k, pre[k], frontier[k], []
+        for cur in layer:
+            steps += 1
+            if view is not None:
+                view[cur // width][cur % width] = Point.Visited
+                yield view
+            col = cur % width
+            for p in (cur - width if cur >= width else -1, cur + width if cur + width < size else -1,
+                      cur - 1 if col > 0 else -1, cur + 1 if col < width - 1 else -1):
+                if p < 0:
+                    continue
+                if side[p] == other: # 同一层中相遇的格子到两侧的层数之和相同，取第一个即可
+                    if meet is None:
+                        meet = (cur, p) if k == 1 else (p, cur)
+                    continue
+                if side[p] or not passable[cells[p]]:
+                    continue
+                side[p], prek[p] = k, cur
+                frontier[k].append(p)
+                if view is not None:
+                    view[p // width][p % width] = Point.NxtVisit
+            if meet is not None or steps >= max_steps:
+                break
+        if steps >= max_steps:
+            break
+    if meet is None:
+        return []
+    path = []
+    for k, cur in ((1, meet[0]), (2, meet[1])): # 两侧分别回溯到起点和终点
+        half = [cur, ]
+        while pre[k][cur] != -1:
+            cur = pre[k][cur]
+            half.append(cur)
+        path.extend(reversed(half) if k == 1 else half)
+    return [[divmod(i, width) for i in path]]
 
-def _calc_cost(cur, targets):
-    # 计算当前点到目标点的最短距离
-    dist = [abs(cur[0] - p[0]) + abs(cur[1] - p[1]) for p in targets]
-    return min(dist)
 
-def a_star(mdata, srcs, targets, max_steps = 50000, max_paths = 1, callback = None):
+def dfs(mdata, srcs, targets, max_steps = 50000, max_paths = 1, callback = None):
     '''
-    多点对多点的A*最短路算法 -> BFS 算法改进为以距离优先出
+    多点对多点的DFS寻路算法(不保证最短)
     NOTE: mdata 为二维数组，入参 srcs 和 targets 需为数组实际下标； callback 为每次迭代计算的回调，用于实时在视图中刷新访问情况
+    实现上使用显式的栈(格子, 下一个待尝试的方向)代替递归，不受递归深度限制；当前路径即栈中的格子，回溯为 O(1) 的出栈
+    每个格子最多进入一次，找到目标后继续回溯搜索其他目标，max_paths > 1 时返回到达不同目标的路径
+    回调中的地图只显示当前路径，回溯时恢复为原来的值
     '''
+    return drive(dfs_steps(mdata, srcs, targets, max_steps, max_paths, visible = callback is not None), callback)
+
+
+def dfs_steps(mdata, srcs, targets, max_steps = 50000, max_paths = 1, visible = True):
+    '''dfs 的分步版本: 每访问一个格子产出一次地图副本，结束时的返回值(StopIteration.value)为路径列表；visible 为 False 时不产出，直接运行到结束'''
     if not _valid_check(mdata, srcs, targets):
         return []
-    width = len(mdata[0]) # 注意数组的保存是从上到下、从左到右
-    height = len(mdata)
-    _mdata = copy.deepcopy(mdata) # 避免直接修改实参
-    
-    q = PriorityQueue() # put by (priority_number, data) and lowest priority retrieved first
-    for p in srcs:
-        q.put((0, p))
+    height, width = len(mdata), len(mdata[0]) # 注意数组的保存是从上到下、从左到右
+    size = height * width
+    cells = _flat_cells(mdata)
+    view = _working_copy(mdata) if visible else None # 避免直接修改实参
+    passable = bytearray(256) # 可以进入的格子，NOTE: 终点也可选
+    passable[Point.Chan] = passable[Point.End] = 1
+    is_target = bytearray(size)
+    for p in targets:
+        is_target[p[0] * width + p[1]] = 1
+    seen = bytearray(size) # 已经进入过的格子，不再重复搜索
+    path, tried = array('i'), bytearray() # 栈: 当前路径上的格子及其已尝试的方向数(上下左右)
     avaliable_paths = [] # 可达结果路径列表
-    targets_set = set(targets) # 避免目标重复和直接修改实参
+    steps = 0 # 访问步数
+
+    for src in srcs:
+        nxt = src[0] * width + src[1]
+        if seen[nxt]:
+            continue
+        while nxt != -1 or path:
+            if nxt != -1: # 进入新的格子
+                steps += 1
+                if len(avaliable_paths) >= max_paths or steps >= max_steps: # 边界条件
+                    return avaliable_paths
+                seen[nxt] = 1
+                path.append(nxt)
+                tried.append(0)
+                if view is not None:
+                    view[nxt // width][nxt % width] = Point.Visited
+                    yield view
+                if is_target[nxt]:
+                    avaliable_paths.append([divmod(i, width) for i in path])
+                    if len(avaliable_paths) >= max_paths: # 已找到足够的路径，不再回溯
+                        return avaliable_paths
+                    tried[-1] = 4 # 目标点不再继续向前搜索
+                nxt = -1
+                continue
+            cur, k = path[-1], tried[-1]
+            if k == 4: # 所有方向都已尝试，回溯
+                path.pop()
+                tried.pop()
+                if view is not None:
+                    view[cur // width][cur % width] = Point(cells[cur])
+                continue
+            tried[-1] = k + 1
+            if k == 0:
+                p = cur - width if cur >= width else -1
+            elif k == 1:
+                p = cur + width if cur + width < size else -1
+            elif k == 2:
+                p = cur - 1 if cur % width > 0 else -1
+            else:
+                p = cur + 1 if cur % width < width - 1 else -1
+            if p >= 0 and not seen[p] and passable[cells[p]]:
+                nxt = p
+    return avaliable_paths
+
+
+def _nearest_target(size, targets):
+    '''返回 h(下标): 到最近目标点的曼哈顿距离(不考虑墙)，作为 A* 的启发函数
+    目标点较少时直接计算；较多时预先用两遍扫描计算整张图的 L1 距离变换，之后每次查询为 O(1)
+    '''
+    height, width = size
+    if len(targets) <= 8:
+        rows, cols = [p[0] for p in targets], [p[1] for p in targets]
+        if len(targets) == 1:
+            tr, tc = rows[0], cols[0]
+            return lambda i: abs(i // width - tr) + abs(i % width - tc)
+        return lambda i: min(abs(i // width - r) + abs(i % width - c) for r, c in zip(rows, cols))
+    far = height + width
+    dist = array('i', [far]) * (height * width)
+    for p in targets:
+        dist[p[0] * width + p[1]] = 0
+    for i in range(height * width): # 从左上到右下
+        d = dist[i]
+        if i % width and dist[i - 1] + 1 < d:
+            d = dist[i - 1] + 1
+        if i >= width and dist[i - width] + 1 < d:
+            d = dist[i - width] + 1
+        dist[i] = d
+    for i in range(height * width - 1, -1, -1): # 从右下到左上
+        d = dist[i]
+        if (i + 1) % width and dist[i + 1] + 1 < d:
+            d = dist[i + 1] + 1
+        if i + width < height * width and dist[i + width] + 1 < d:
+            d = dist[i + width] + 1
+        dist[i] = d
+    return dist.__getitem__
 
-    steps = 0 # 计算次数，避免超时
-    pre_points = {} # 前序索引，用于回溯
 
-    while not q.empty() and targets_set: # 注意 q == True
-        _, cur = q.get()
+def _a_star(mdata, srcs, targets, max_steps, max_paths, visible):
+    '''按 f = g + h 出队的 A* 内核，h 为到最近目标点的曼哈顿距离(一致的启发函数，出队时 g 即最短距离)
+    heapq 的元素为 (f, -g, 下标)，f 相同时 g 大(离目标近)的先出；更短的 g 出现时直接重复入队，出队时跳过过期的元素
+    出队时标记为 Visited，入队时标记为 NxtVisit；只有 visible 时才写入地图副本并产出(每出队一个格子产出一次)
+    '''
+    height, width = len(mdata), len(mdata[0]) # 注意数组的保存是从上到下、从左到右
+    size = height * width
+    cells = _flat_cells(mdata)
+    view = _working_copy(mdata) if visible else None # 避免直接修改实参
+    passable = bytearray(256) # 可以进入的格子，NOTE: 终点也可选
+    passable[Point.Chan] = passable[Point.End] = 1
+    is_target = bytearray(size)
+    for p in targets:
+        is_target[p[0] * width + p[1]] = 1
+    h = _nearest_target((height, width), targets)
+    src_set = set(p[0] * width + p[1] for p in srcs)
+    pre = array('i', [-1]) * size # 前序索引，用于回溯
+    g = array('i', [size]) * size # 已知的最短距离，size 表示尚未到达
+    q = []
+    for i in src_set:
+        g[i] = 0
+        q.append((h(i), 0, i))
+    heapq.heapify(q)
+
+    avaliable_paths = [] # 可达结果路径列表
+    steps = 0 # 计算次数，避免超时
+    while q:
+        _, neg_g, cur = heapq.heappop(q)
+        if -neg_g != g[cur]: # 已有更短的路径入队，跳过过期的元素
+            continue
         steps += 1
-        _mdata[cur[0]][cur[1]] = Point.Visited
-        if callback is not None:
-            callback(_mdata)
-        if cur in targets_set: # 找到目标
-            avaliable_paths.append(_backtrace(pre_points, srcs, cur)) # 保存最短路径
-            # targets_set.remove(cur) # 移除目标，此处无需移除，允许下一条路径到达该目标
-        else: # 非目标节点，增加相邻的合法节点
-            udlr = [(cur[0] - 1, cur[1]), (cur[0] + 1, cur[1]), (cur[0], cur[1] - 1), (cur[0], cur[1] + 1),]
-            qadd = [p for p in udlr if 0 <= p[0] < height and 0 <= p[1] < width and _mdata[p[0]][p[1]] in (Point.Chan, Point.End)] # NOTE: 终点也可选
-            # NOTE: A* 算法和BFS算法的主要差异点就在这里
-            for p in qadd: # 记录目标点是从当前位置过去的
-                q.put((_calc_cost(p, targets), p))
-                _mdata[p[0]][p[1]] = Point.NxtVisit # 已经走过，设置即将访问的点避免再次被加入访问队列
-                if p not in pre_points: # 增加标记前进路线，避免重复增加
-                    pre_points[p] = cur
+        if view is not None:
+            view[cur // width][cur % width] = Point.Visited
+            yield view
+        if is_target[cur]: # 找到目标
+            avaliable_paths.append(_backtrace(pre, src_set, cur, width)) # 保存最短路径
+        else: # 非目标节点，更新相邻的合法节点(上下左右)
+            col, step = cur % width, g[cur] + 1
+            for p in (cur - width if cur >= width else -1, cur + width if cur + width < size else -1,
+                      cur - 1 if col > 0 else -1, cur + 1 if col < width - 1 else -1):
+                if p < 0 or not passable[cells[p]] or step >= g[p]:
+                    continue
+                g[p], pre[p] = step, cur
+                heapq.heappush(q, (step + h(p), -step, p))
+                if view is not None:
+                    view[p // width][p % width] = Point.NxtVisit
         if len(avaliable_paths) >= max_paths:
             break
         if steps >= max_steps:
@@ -240,6 +487,244 @@ def a_star(mdata, srcs, targets, max_steps = 50000, max_paths = 1, callback = No
     return avaliable_paths
 
 
+def a_star(mdata, srcs, targets, max_steps = 50000, max_paths = 1, callback = None, greedy = False):
+    '''
+    多点对多点的A*最短路算法 -> BFS 算法改进为按 已走距离 + 到最近目标的估计距离 优先出，结果为最短路且访问的点少于BFS
+    NOTE: mdata 为二维数组，入参 srcs 和 targets 需为数组实际下标； callback 为每次迭代计算的回调，用于实时在视图中刷新访问情况
+    greedy 为 True 时只按估计距离出队(贪心最佳优先)，访问的点通常更少，但不保证是最短路
+    '''
+    return drive(a_star_steps(mdata, srcs, targets, max_steps, max_paths, greedy = greedy, visible = callback is not None), callback)
+
+
+def a_star_steps(mdata, srcs, targets, max_steps = 50000, max_paths = 1, greedy = False, visible = True):
+    '''a_star 的分步版本: 每访问一个格子产出一次地图副本，结束时的返回值(StopIteration.value)为路径列表；visible 为 False 时不产出，直接运行到结束'''
+    if not _valid_check(mdata, srcs, targets):
+        return []
+    if not greedy:
+        return (yield from _a_star(mdata, srcs, targets, max_steps, max_paths, visible))
+    width = len(mdata[0])
+    h = _nearest_target((len(mdata), width), targets)
+    return (yield from _search(mdata, srcs, targets, max_steps, max_paths, visible, cost = h))
+
+
+class DistanceField(object):
+    '''到终点的距离场: 从所有终点做一次多源BFS，记录每个非墙格子到最近终点的步数(int32，-1 表示不可达)
+    之后"从这里出发的最短路"、"离终点多远"、"下一步往哪走"都只需沿距离递减的方向走，开销与路径长度成正比
+    通过 DistanceField.of 按地图缓存，只有地图结构变化(墙、起止点)时才重新计算
+    '''
+    def __init__(self, grid, ends = None):
+        height, width = grid.size
+        self._size = (height, width)
+        self.ends = list(grid.positions(Point.End) if ends is None else ends)
+        size = height * width
+        cells = grid.tobytes()
+        dist = array('i', [-1]) * size
+        q = deque()
+        for p in self.ends:
+            i = p[0] * width + p[1]
+            if dist[i] == -1:
+                dist[i] = 0
+                q.append(i)
+        while q:
+            cur = q.popleft()
+            step, col = dist[cur] + 1, cur % width
+            for p in (cur - width if cur >= width else -1, cur + width if cur + width < size else -1,
+                      cur - 1 if col > 0 else -1, cur + 1 if col < width - 1 else -1):
+                if p >= 0 and dist[p] == -1 and cells[p] != Point.Wall:
+                    dist[p] = step
+                    q.append(p)
+        self.dist = dist
+
+    @staticmethod
+    def of(grid, ends = None):
+        '''返回网格到 ends(默认为地图中的终点)的距离场；只缓存到地图自身终点的距离场(按网格的拓扑版本号)，
+        其它终点每次重新计算，避免不同的 ends 在网格上无限累积
+        '''
+        if ends is not None and sorted(ends) != grid.positions(Point.End):
+            return DistanceField(grid, ends)
+        return grid.cached("distance_field", DistanceField)
+
+    def distance(self, p):
+        '''p 到最近终点的步数，不可达时返回 -1'''
+        return self.dist[p[0] * self._size[1] + p[1]]
+
+    def next_step(self, p):
+        '''从 p 出发沿最短路的下一步，已在终点或不可达时返回 None'''
+        height, width = self._size
+        d = self.distance(p)
+        if d <= 0:
+            return None
+        for q in ((p[0] - 1, p[1]), (p[0] + 1, p[1]), (p[0], p[1] - 1), (p[0], p[1] + 1)): # 与 bfs 相同的上下左右顺序
+            if 0 <= q[0] < height and 0 <= q[1] < width and self.dist[q[0] * width + q[1]] == d - 1:
+                return q
+        return None
+
+    def path(self, p):
+        '''从 p 到最近终点的最短路(含两端)，不可达时返回空列表'''
+        if self.distance(p) < 0:
+            return []
+        path = [tuple(p), ]
+        while True:
+            q = self.next_step(path[-1])
+            if q is None:
+                return path
+            path.append(q)
+
+
+class Solver(_PaddedGrid):
+    '''同一张地图上的批量最短路: 构造时准备好补墙后的可通行表及可复用的前序和访问标记数组
+    solve_many 把终点(或起点)相同的查询合并为一次 BFS，访问标记按轮次区分，每次 BFS 不需要清空数组
+    非墙的格子均可通行；地图结构变化后需重新构造，Solver.of 按拓扑版本号缓存
+    '''
+    def __init__(self, grid):
+        super().__init__(grid)
+        self._nxt = array('i', [-1]) * len(self._cells) # BFS 树中朝根方向的下一格
+        self._seen = array('i', [0]) * len(self._cells) # 访问到该格子的 BFS 轮次
+        self._round = 0
+
+    @staticmethod
+    def of(grid):
+        '''返回网格对应的 Solver，按网格的拓扑版本号缓存'''
+        return grid.cached("solver", Solver)
+
+    def _flood(self, root, goals):
+        # 从 root 做 BFS，goals 都访问到后提前结束
+        self._round += 1
+        r, cells, seen, nxt, offsets = self._round, self._cells, self._seen, self._nxt, self._offsets
+        seen[root], nxt[root] = r, -1
+        left = set(goals)
+        left.discard(root)
+        q = [root, ]
+        for cur in q: # 遍历时追加即为先进先出的队列
+            if not left:
+                break
+            for d in offsets:
+                j = cur + d
+                if cells[j] and seen[j] != r:
+                    seen[j], nxt[j] = r, cur
+                    q.append(j)
+                    left.discard(j)
+
+    def _trace(self, j):
+        # 沿 BFS 树从 j 走到根
+        path, nxt = [j, ], self._nxt
+        while nxt[j] != -1:
+            j = nxt[j]
+            path.append(j)
+        return path
+
+    def solve_many(self, pairs):
+        '''批量求 [(起点, 终点), ...] 的最短路，按输入顺序返回路径列表，不可达时为空列表
+        终点相同的查询共用一次从终点出发的 BFS；不同起点比不同终点少时改为从起点出发
+        '''
+        ids = [(self._pid(s), self._pid(t)) for s, t in pairs]
+        flip = len(set(s for s, _ in ids)) < len(set(t for _, t in ids))
+        groups = {} # BFS 的根 -> [(查询序号, 另一端), ...]
+        for k, (s, t) in enumerate(ids):
+            root, other = (s, t) if flip else (t, s)
+            groups.setdefault(root, []).append((k, other))
+        res, cells = [[] for _ in ids], self._cells
+        for root, items in groups.items():
+            if not cells[root]:
+                continue
+            self._flood(root, [o for _, o in items if cells[o]])
+            for k, other in items:
+                if other == root: # 与 bfs 一致: 起点即终点
+                    res[k] = [self._coord(root)] * 2
+                elif cells[other] and self._seen[other] == self._round:
+                    path = [self._coord(j) for j in self._trace(other)]
+                    res[k] = path[::-1] if flip else path
+        return res
+
+    def solve(self, src, dst):
+        '''单个查询，等价于 solve_many([(src, dst)])[0]'''
+        return self.solve_many([(src, dst), ])[0]
+
+
+class LPAStar(_PaddedGrid):
+    '''增量最短路(Lifelong Planning A*): 保存每个格子的 g(已确认的起点距离)和 rhs(由相邻格子推出的距离)
+    格子在墙和通道之间切换后只需调用 update，再次查询时只重新计算不一致的格子，开销与改动影响的范围成正比
+    g/rhs 按补墙后的下标存放，外圈的墙 g 始终为 INF，由相邻格子推出 rhs 时不需要判断边界
+    '''
+    INF = 1 << 30
+
+    def __init__(self, grid, start, goal):
+        super().__init__(grid)
+        self.g = array('i', [self.INF]) * len(self._cells)
+        self.rhs = array('i', [self.INF]) * len(self._cells)
+        self._start, self._goal = self._pid(start), self._pid(goal)
+        self._gm, self._gn = divmod(self._goal, self._stride)
+        self._q = [] # (key1, key2, 下标)，延迟删除过期的项
+        self._update_vertex(self._start)
+
+    def _key(self, i):
+        k = min(self.g[i], self.rhs[i])
+        return (k + abs(i // self._stride - self._gm) + abs(i % self._stride - self._gn), k)
+
+    def _update_vertex(self, i):
+        g, cells = self.g, self._cells
+        if not cells[i]:
+            rhs = self.INF
+        elif i == self._start:
+            rhs = 0
+        else:
+            rhs = min(g[i - self._stride], g[i + self._stride], g[i - 1], g[i + 1]) + 1 # 墙的 g 始终为 INF
+            rhs = min(rhs, self.INF)
+        self.rhs[i] = rhs
+        if g[i] != rhs:
+            heapq.heappush(self._q, self._key(i) + (i, ))
+
+    def update(self, p, value):
+        '''格子 p 的值变为 value 后调用，只记录受影响的格子，实际计算推迟到下次查询'''
+        i = self._pid(p)
+        passable = int(value != Point.Wall)
+        if self._cells[i] == passable:
+            return
+        self._cells[i] = passable
+        if not passable:
+            self.g[i] = self.INF
+        self._update_vertex(i)
+        for d in self._offsets:
+            if self._cells[i + d]:
+                self._update_vertex(i + d)
+
+    def _compute(self):
+        g, rhs, q, goal = self.g, self.rhs, self._q, self._goal
+        while q:
+            k1, k2, i = q[0]
+            if g[i] == rhs[i] or (k1, k2) != self._key(i): # 已一致或过期的项
+                heapq.heappop(q)
+                continue
+            if (k1, k2) >= self._key(goal) and g[goal] == rhs[goal]:
+                break
+            heapq.heappop(q)
+            if g[i] > rhs[i]: # 距离变短，直接确认
+                g[i] = rhs[i]
+            else: # 距离变长，先作废再重新推算
+                g[i] = self.INF
+                self._update_vertex(i)
+            for d in self._offsets:
+                if self._cells[i + d]:
+                    self._update_vertex(i + d)
+
+    @property
+    def distance(self):
+        '''起点到终点的步数，不可达时返回 -1'''
+        self._compute()
+        d = self.g[self._goal]
+        return d if d < self.INF else -1
+
+    def path(self):
+        '''起点到终点的最短路(含两端)，不可达时返回空列表'''
+        if self.distance < 0:
+            return []
+        g, cur = self.g, self._goal
+        path = [cur, ]
+        while cur != self._start:
+            cur = next(cur + d for d in self._offsets if g[cur + d] == g[cur] - 1)
+            path.append(cur)
+        return [self._coord(j) for j in reversed(path)]
+
 
 if __name__ == '__main__':
     import doctest
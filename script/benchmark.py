@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-17 22:47:32
+# @Author  : HeLiang (helianghit@foxmail.com)
+# @Link    : https://github.com/HeLiangHIT
+
+'''
+迷宫生成算法的性能测试，使用示例:
+python script/benchmark.py --methods dfsg,primg --sizes 300,1000,4000 --repeat 3
+'''
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.sep.join([os.path.dirname(os.path.realpath(__file__)), ".."]))
+from algorithm.generate import dfsg, primg, kruskalg, ellerg, wilsong, divisiong, binarytreeg, sidewinderg
+
+
+GENERATORS = {
+    "dfsg": dfsg,
+    "primg": primg,
+    "kruskalg": kruskalg,
+    "ellerg": ellerg,
+    "wilsong": wilsong,
+    "divisiong": divisiong, # 以下需要 numpy
+    "binarytreeg": binarytreeg,
+    "sidewinderg": sidewinderg,
+}
+
+
+def _as_tuple(value):
+    # fire 会把 "a,b" 解析为 tuple，单个值则保持原样
+    if isinstance(value, (tuple, list)):
+        return tuple(value)
+    return tuple(v for v in str(value).split(",") if v)
+
+
+def bench_generate(method, size, repeat = 1, seed = 0):
+    '''返回多次生成 size 尺寸迷宫的最短耗时(秒)'''
+    generate = GENERATORS[method]
+    best = float("inf")
+    for i in range(repeat):
+        random.seed(seed + i)
+        begin = time.perf_counter()
+        generate(size, [(0, 0), ], [(size[0] - 1, size[1] - 1), ])
+        best = min(best, time.perf_counter() - begin)
+    return best
+
+
+def main(methods = "dfsg,primg,kruskalg,ellerg,wilsong,divisiong,binarytreeg,sidewinderg", sizes = "100,300,1000", repeat = 1, seed = 0):
+    ''' benchmark maze generators
+    Args:
+        methods: generator names split by comma, Optional: dfsg/primg/kruskalg/ellerg/wilsong/divisiong/binarytreeg/sidewinderg
+        sizes: square maze sizes split by comma
+        repeat: run each case repeat times and report the best
+        seed: random seed of the first run
+    '''
+    print(f"{'method':>12} {'size':>12} {'seconds':>10} {'cells/s':>12}")
+    for method in _as_tuple(methods):
+        for n in _as_tuple(sizes):
+            n = int(n)
+            try:
+                cost = bench_generate(method, (n, n), repeat, seed)
+            except ImportError as e: # numpy 等可选依赖未安装
+                print(f"{method:>12} skipped: {e}")
+                break
+            print(f"{method:>12} {f'{n}X{n}':>12} {cost:>10.3f} {n * n / cost:>12.0f}")
+
+
+if __name__ == '__main__':
+    import fire
+    fire.Fire(main)
@@ -16,3 +16,7 @@ function test_cmd(){
 test_cmd "python -m algorithm.map"
 test_cmd "python -m algorithm.search"
 test_cmd "python -m algorithm.generate"
+test_cmd "python -m algorithm.graph"
+test_cmd "python -m algorithm.batch"
+test_cmd "python -m algorithm.events"
+test_cmd "env QT_QPA_PLATFORM=offscreen python -m doctest ui/pyqt/main.py"
@@ -21,7 +21,7 @@ from direct.task.Timer import Timer
 
 from algorithm.map import Point, Map
 from algorithm.generate import dfsg, primg
-from algorithm.search import bfs, dfs, a_star
+from algorithm.search import dfs, a_star, DistanceField
 
 
 _script_dir = os.path.dirname(os.path.realpath(__file__))
@@ -224,7 +224,11 @@ class MyApp(ShowBase):
         self.accept("escape", sys.exit)
 
     def auto_run_maze(self):
-        answers  = bfs(self.maze_map.data, [self.start, ], [self.end, ])
+        # 距离场按地图缓存，从熊猫当前所在的位置沿距离递减的方向走到终点即可，无需每次重新搜索
+        here = (round(self.panda.getX()), round(self.panda.getY()))
+        answers = [DistanceField.of(self.maze_map.data, [self.end, ]).path(here), ]
+        if len(answers[0]) < 2: # 已在终点或不可达
+            return
         class ActAnswer():
             def __init__(self, answer, actor, checker, interrupter, recover):
                 self.answer = answer
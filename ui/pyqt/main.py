@@ -6,31 +6,93 @@
 # @ref     : https://doc.qt.io/qtforpython/PySide6/QtWidgets/QGraphicsView.html#qgraphicsview
 
 '''
-pyqt 编写的贪吃蛇界面
+pyqt 编写的贪吃蛇界面，迷宫绘制在后备缓存上，增量修改只重绘修改的格子，结果与整体重建一致，使用示例如下:
+>>> import random; from algorithm.generate import primg
+>>> app = QApplication.instance() or QApplication([])
+>>> random.seed(0); w = MazeWidget(); w.resize(333, 257) # 格子尺寸不是整数像素
+>>> w.new_maze(primg((21, 29), [(0, 0),], [(20, 28),])); w._rebuild()
+>>> w.apply_changes([(n, m, Point.Visited) for n in range(21) for m in range(29) if w.m.data[n][m] == Point.Chan][::3])
+>>> w.apply_changes([(0, 1, Point.NxtVisit), (20, 27, Point.Wall), (10, 10, Point.Chan)])
+>>> incremental = w.pix.toImage(); w._rebuild(); w.pix.toImage() == incremental # 增量绘制与整体重建的结果一致
+True
 '''
 import os
 import sys
 import time
+import pickle
+import struct
+import traceback
 from functools import reduce
 from math import ceil # ceil = lambda x: x on windows and mac(support drawRect with float)
-import copy
-from PyQt5 import QtCore, QtGui, QtWidgets, Qt, QtTest
+from PyQt5 import QtCore, QtGui, QtWidgets, Qt
 from PyQt5.QtWidgets import QApplication
 from algorithm.map import Point, Map
-from algorithm.search import bfs, dfs, a_star
-from algorithm.generate import dfsg, primg, kruskalg
+from algorithm.search import bibfs, bfs_steps, bibfs_steps, dfs_steps, a_star_steps, LPAStar
+from algorithm.graph import junction_search_steps
+from algorithm.generate import dfsg_steps, primg_steps, kruskalg_steps, ellerg_steps, wilsong_steps
+from algorithm.events import DeltaStream, drive
 
 
 _script_dir = os.path.dirname(os.path.realpath(__file__))
 
 
+class StepsWorker(QtCore.QObject):
+    '''在后台线程中运行分步算法，界面线程只通过信号接收结果，算法运行时窗口不会卡住
+    可视化时每步记录修改的格子，约每 16ms 合并发出一批 changes，并发出已运行的步数 progress；
+    finished 只在算法正常结束时发出，cancel 后在下一步停止并丢弃结果；delay 为每步之后等待的秒数(控制速度)
+    '''
+    reset = QtCore.pyqtSignal(object) # 算法换了地图，参数为地图快照
+    changes = QtCore.pyqtSignal(object) # [(行, 列, 值), ...]
+    progress = QtCore.pyqtSignal(int)
+    finished = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str) # 算法抛出异常，参数为错误信息；异常不能离开线程，否则 PyQt 会终止进程
+
+    def __init__(self, steps, delay = 0):
+        super().__init__()
+        self.steps, self.delay = steps, delay
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True # 只在两步之间检查，不需要加锁
+
+    def run(self):
+        # 网格以写时复制的快照发出，算法继续修改时不会影响界面线程中的地图
+        stream = DeltaStream(self.changes.emit, every = None, on_reset = lambda data: self.reset.emit(Map().from_data(data)))
+        count, frame = 0, time.perf_counter() + 0.016
+        try:
+            while not self._cancelled:
+                stream(next(self.steps))
+                count += 1
+                if self.delay:
+                    time.sleep(self.delay)
+                if time.perf_counter() >= frame: # 约 60 帧每秒
+                    stream.flush()
+                    self.progress.emit(count)
+                    frame = time.perf_counter() + 0.016
+            self.steps.close()
+            stream.close()
+        except StopIteration as e:
+            stream.close()
+            self.progress.emit(count)
+            self.finished.emit(e.value)
+        except Exception as e:
+            traceback.print_exc()
+            stream.close()
+            self.failed.emit(f"{type(e).__name__}: {e}")
+
+
 class MazeMain(QtWidgets.QWidget):
     DEFAULT = (15, 20) # 默认迷宫尺寸
     MAX = (300, 400) # 最大支持的迷宫尺寸
+    SYNC_CELLS = 10000 # 不超过该格子数且不可视化时直接在界面线程运行
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._task = None # 后台线程中运行的算法 (线程, StepsWorker)
+        self._threads = set() # 已取消但还没退出的线程，退出前需保持引用
         self.init_ui()
         self.gen_btn.clicked.connect(self.generate_maze)
+        self.cancel_btn.clicked.connect(self._cancel_steps)
+        self.speed_slider.valueChanged.connect(self._change_speed)
         self.draw_btn.clicked.connect(self.draw_maze)
         self.run_btn.clicked.connect(self.run_maze)
         self.auto_btn.clicked.connect(self.auto_maze)
@@ -44,11 +106,14 @@ class MazeMain(QtWidgets.QWidget):
         path, fileType = QtWidgets.QFileDialog.getOpenFileName(self, "选择文件", './demo', "Map Files(*.map)")
         if not path:
             return
-        with open(path, 'r') as f:
-            self.maze_map, ok = Map().from_json(f.read())
-            if not ok:
-                QtWidgets.QMessageBox.information(self, "文件无效", "无法解析该文件", QtWidgets.QMessageBox.Yes, QtWidgets.QMessageBox.Yes)
-                return
+        try:
+            maze_map = Map.load(path, allow_pickle = False) # 自动识别二进制/json格式，不加载可以执行任意代码的 pickle
+        except (ValueError, KeyError, TypeError, IndexError, struct.error, pickle.UnpicklingError): # 含 json.JSONDecodeError
+            maze_map = None
+        if maze_map is None or not maze_map.start or not maze_map.end:
+            QtWidgets.QMessageBox.information(self, "文件无效", "无法解析该文件", QtWidgets.QMessageBox.Yes, QtWidgets.QMessageBox.Yes)
+            return
+        self.maze_map = maze_map
         self.size, self.start, self.end = self.maze_map.size, self.maze_map.start[0], self.maze_map.end[0]
         [e.setText(str(v)) for e, v in zip((self.maze_height, self.maze_width, self.start_x, self.start_y, self.end_x, self.end_y), self.size + self.start + self.end)]
         self.maze.new_maze(self.maze_map)
@@ -57,11 +122,11 @@ class MazeMain(QtWidgets.QWidget):
         path, _ = QtWidgets.QFileDialog.getSaveFileName(self, 'Save File', f'./demo/{self.size[0]}X{self.size[1]}.map')
         if not path:
             return
-        with open(path,'w') as f:
-            f.write(self.maze_map.to_json())
+        self.maze_map.save(path, fmt = "binary")
 
     def draw_maze(self):
         # 鼠标左键绘制通道/墙体
+        self._cancel_steps()
         if not self.is_drawing:
             self._start_draw()
         else:
@@ -70,23 +135,27 @@ class MazeMain(QtWidgets.QWidget):
     def _finish_draw(self):
         if self.draw_btn.text().count("完成") > 0:
             self.maze_map = self.maze.get_map()
+            self.size, self.start, self.end = self.maze_map.size, self.maze_map.start[0], self.maze_map.end[0]
         self.maze.new_maze(self.maze_map)
         [btn.setDisabled(False) for btn in (self.gen_btn, self.run_btn, self.auto_btn)]
         self.draw_btn.setText("绘制迷宫")
     def _start_draw(self):
         [btn.setDisabled(True) for btn in (self.gen_btn, self.run_btn, self.auto_btn)]
         self.draw_btn.setText("无效迷宫，取消绘制")
-        def fresh_and_check(m):
-            answers = a_star(m.data, [self.start,], [self.end,])
-            self.draw_btn.setText(("无效迷宫，取消绘制", "有效迷宫，完成绘制")[len(answers) > 0])
-        self.size, self.start, self.end = self._parser_input_text()
-        m = Map(self.size, default = Point.Wall)
-        m.data[self.start[0]][self.start[1]] = Point.Start
-        m.data[self.end[0]][self.end[1]] = Point.End
+        def fresh_and_check(m, pos):
+            # 增量更新翻转的格子，每次检查只修复受影响的部分
+            planner.update(pos, m.data[pos[0]][pos[1]])
+            self.draw_btn.setText(("无效迷宫，取消绘制", "有效迷宫，完成绘制")[planner.distance >= 0])
+        size, start, end = self._parser_input_text() # 完成绘制后才成为当前迷宫的尺寸和起止点
+        m = Map(size, default = Point.Wall)
+        m.data[start[0]][start[1]] = Point.Start
+        m.data[end[0]][end[1]] = Point.End
+        planner = LPAStar(m.data, start, end)
         self.maze.new_maze(m, callback = fresh_and_check, mode = "draw") # 注册绘制的回调函数
 
     def run_maze(self):
         # 鼠标左键绘制路线，右键消除路线 - 走迷宫的时候重新生成或者自动走都不会影响绘制，可以不禁用其它按钮
+        self._cancel_steps()
         def fresh_and_check(m):
             # 检查终点附近是不是已经走到了
             udlr = [(self.end[0] - 1, self.end[1]), (self.end[0] + 1, self.end[1]), (self.end[0], self.end[1] - 1), (self.end[0], self.end[1] + 1),]
@@ -94,33 +163,113 @@ class MazeMain(QtWidgets.QWidget):
                                 [0 <= q[0] < self.size[0] and 0 <= q[1] < self.size[1] and m.data[q[0]][q[1]] in (Point.Start, Point.Visited) for q in udlr])
             if visited_nb >= 1:
                 ndata = [[Point.Chan if p in (Point.Visited, Point.Start, Point.End) else Point.Wall for p in row] for row in m.data] # 用于根据走的路径寻找答案
-                answers = bfs(ndata, [self.start, ], [self.end, ])
+                answers = bibfs(ndata, [self.start, ], [self.end, ], max_steps = self.size[0] * self.size[1])
                 self.maze.new_maze(self.maze_map, answers[0]) # 重绘答案
                 QtWidgets.QMessageBox.information(self, "恭喜通关", "恭喜通关", QtWidgets.QMessageBox.Yes, QtWidgets.QMessageBox.Yes)
         self.maze.new_maze(self.maze_map, callback = fresh_and_check, mode = "run") # 注册绘制的回调函数
 
     def generate_maze(self):
         idx = self.gen_combo.currentIndex()
-        generate = {0: primg, 1: dfsg}[idx]
-        self.size, self.start, self.end = self._parser_input_text()
-        self.maze_map = generate(self.size, [self.start, ], [self.end, ], callback = self._fresh_callback if self.visible_check.isChecked() else None)
-        self.maze.new_maze(self.maze_map)
+        generate = {0: primg_steps, 1: dfsg_steps, 2: kruskalg_steps, 3: ellerg_steps, 4: wilsong_steps}[idx]
+        size, start, end = self._parser_input_text()
+        def done(maze_map):
+            # 尺寸和起止点与迷宫一起更新，取消生成时保持与当前迷宫一致
+            self.maze_map = maze_map
+            self.size, self.start, self.end = size, start, end
+            self.maze.new_maze(self.maze_map)
+        self._run_steps(generate(size, [start, ], [end, ], visible = self.visible_check.isChecked()), done, size[0] * size[1])
 
     def auto_maze(self):
         idx = self.auto_combo.currentIndex()
-        search = {0: bfs, 1: dfs, 2: a_star}[idx]
-        answers = search(self.maze_map.data, [self.start,], [self.end,], callback = self._fresh_callback if self.visible_check.isChecked() else None)
-        answer = answers[0] if len(answers) > 0 else []
-        self.maze.new_maze(self.maze_map, answer)
-
-    def _fresh_callback(self, data, interval = 0.01):
-        speed = self.speed_slider.value()
-        interval = (1e-7, 1e-4, 1e-1)[(speed < 33) + (speed < 66)] # 三个档慢、中、快
-        m = Map().from_data(data)
-        self.maze.update_maze(m)
-        # QApplication.processEvents() # 强制刷新界面 - 性能较差，改为在组件中 repaint
-        # time.sleep(interval) # 会卡UI
-        QtTest.QTest.qWait(interval * 1000) # 单位 msecs, 不卡UI
+        search = {0: bfs_steps, 1: dfs_steps, 2: a_star_steps, 3: bibfs_steps, 4: junction_search_steps}[idx]
+        def done(answers):
+            answer = answers[0] if len(answers) > 0 else []
+            self.maze.new_maze(self.maze_map, answer)
+            if not answer: # 用连通分量索引区分不可达和超过步数上限
+                reason = "超过了搜索步数上限" if self.maze_map.connected(self.start, self.end) else "起点和终点之间不连通"
+                QtWidgets.QMessageBox.information(self, "没有找到路径", reason, QtWidgets.QMessageBox.Yes, QtWidgets.QMessageBox.Yes)
+        cells = self.size[0] * self.size[1]
+        # 每个格子至多进入一次，步数上限与 run_maze 一样取格子数，多留一步给恰好最后进入的终点
+        steps = search(self.maze_map.data, [self.start,], [self.end,], max_steps = cells + 1, visible = self.visible_check.isChecked())
+        self._run_steps(steps, done, cells)
+
+    def _step_delay(self):
+        # 三个档快、中、慢: 不等待、约每帧 4 步、每秒 10 步
+        level = (self.speed_slider.value() < 33) + (self.speed_slider.value() < 66)
+        return (0, 0.004, 0.1)[level]
+
+    def _change_speed(self, value):
+        if self._task is not None:
+            self._task[1].delay = self._step_delay() if self.visible_check.isChecked() else 0
+
+    def _run_steps(self, steps, done, cells):
+        # 运行 cells 个格子上的分步算法，结束后以结果调用 done；再次启动任何操作都会取消正在运行的算法
+        # 小地图不可视化时直接运行，否则在后台线程中运行，修改的格子、进度和结果都通过信号交给界面线程
+        self._cancel_steps()
+        visible = self.visible_check.isChecked()
+        if not visible and cells <= self.SYNC_CELLS:
+            try:
+                result = drive(steps)
+            except Exception as e:
+                traceback.print_exc()
+                self._show_error(f"{type(e).__name__}: {e}")
+                return
+            done(result)
+            return
+        thread, worker = QtCore.QThread(self), StepsWorker(steps, self._step_delay() if visible else 0)
+        worker.moveToThread(thread)
+        task = (thread, worker)
+        # 已取消的任务可能还有排队中的信号，只处理当前任务的
+        def current(slot):
+            return lambda value: slot(value) if self._task is task else None
+        worker.reset.connect(current(self.maze.update_maze))
+        worker.changes.connect(current(self.maze.apply_changes))
+        worker.progress.connect(current(lambda count: self._show_progress(count, cells)))
+        worker.finished.connect(current(lambda result: (self._end_steps(), done(result))))
+        worker.failed.connect(current(lambda message: (self._end_steps(), self._show_error(message))))
+        thread.started.connect(worker.run)
+        thread.finished.connect(lambda: (worker.deleteLater(), thread.deleteLater(), self._threads.discard(task)))
+        worker.finished.connect(thread.quit) # worker 在线程中，直接连接到 quit
+        worker.failed.connect(thread.quit)
+        self._task = task
+        self._threads.add(task)
+        self.progress_bar.setRange(0, 0) # 步数未知，显示为忙碌状态
+        self.progress_bar.setFormat("")
+        [btn.setDisabled(True) for btn in (self.gen_btn, self.auto_btn)]
+        self.cancel_btn.setDisabled(False)
+        thread.start()
+
+    def _show_progress(self, count, cells):
+        # 每步至多访问或修改一个格子，以格子数作为进度的上限
+        self.progress_bar.setRange(0, cells)
+        self.progress_bar.setValue(min(count, cells))
+        self.progress_bar.setFormat(f"{count} 步")
+
+    def _show_error(self, message):
+        QtWidgets.QMessageBox.warning(self, "运行出错", message, QtWidgets.QMessageBox.Yes, QtWidgets.QMessageBox.Yes)
+
+    def _end_steps(self):
+        # 恢复界面状态，线程在 worker 返回后自行退出
+        self._task = None
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        [btn.setDisabled(False) for btn in (self.gen_btn, self.auto_btn)]
+        self.cancel_btn.setDisabled(True)
+
+    def _cancel_steps(self):
+        # 取消后台线程中正在运行的算法，线程在当前一步结束后退出
+        if self._task is None:
+            return
+        thread, worker = self._task
+        worker.cancel()
+        thread.quit()
+        self._end_steps()
+
+    def closeEvent(self, e):
+        self._cancel_steps()
+        for thread, _ in list(self._threads): # 等待正在运行的一步结束再销毁线程
+            thread.wait()
+        super().closeEvent(e)
 
     def _parser_input_text(self):
         size = (int(self.maze_height.text()), int(self.maze_width.text()))
@@ -220,7 +369,9 @@ class MazeMain(QtWidgets.QWidget):
         self.gen_combo = QtWidgets.QComboBox(self)
         self.gen_combo.addItem("Prim算法")
         self.gen_combo.addItem("深度优先")
-        # self.gen_combo.addItem("Kruskal算法") # TODO: 待开发
+        self.gen_combo.addItem("Kruskal算法")
+        self.gen_combo.addItem("Eller算法")
+        self.gen_combo.addItem("Wilson算法")
         h_layout_gen.addWidget(self.gen_combo)
         self.gen_btn = QtWidgets.QPushButton(self)
         self.gen_btn.setText("生成迷宫")
@@ -232,12 +383,26 @@ class MazeMain(QtWidgets.QWidget):
         self.auto_combo.addItem("BFS")
         self.auto_combo.addItem("DFS")
         self.auto_combo.addItem("A*")
+        self.auto_combo.addItem("双向BFS")
+        self.auto_combo.addItem("路口图")
         h_layout_auto.addWidget(self.auto_combo)
         self.auto_btn = QtWidgets.QPushButton(self)
         self.auto_btn.setText("走迷宫")
         h_layout_auto.addWidget(self.auto_btn)
         v_layout_auto.addLayout(h_layout_auto)
 
+        h_layout_progress = QtWidgets.QHBoxLayout()
+        self.progress_bar = QtWidgets.QProgressBar(self)
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setTextVisible(True)
+        h_layout_progress.addWidget(self.progress_bar)
+        self.cancel_btn = QtWidgets.QPushButton(self)
+        self.cancel_btn.setText("取消")
+        self.cancel_btn.setDisabled(True)
+        h_layout_progress.addWidget(self.cancel_btn)
+        v_layout_auto.addLayout(h_layout_progress)
+
         gb.setLayout(v_layout_auto)
         v_layout_right.addWidget(gb)
 
@@ -288,6 +453,9 @@ class MazeWidget(QtWidgets.QWidget):
         Point.Visited: QtCore.Qt.cyan,
         Point.NxtVisit: QtCore.Qt.gray,
         }
+    Palette = [QtGui.QColor(c).rgb() for c in map(ColorMap.get, range(256), [QtCore.Qt.white] * 256)] # 格子值 -> 颜色，用于 Indexed8 图像
+    Icons = {Point.Start: "run.png", Point.End: "flag.png"}
+    _icon_cache = {} # 图标只从磁盘加载一次
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.setAttribute(QtCore.Qt.WA_AcceptTouchEvents, True) # 允许触摸响应
@@ -295,13 +463,12 @@ class MazeWidget(QtWidgets.QWidget):
 
     def new_maze(self, maze_map, answer = None, callback = None, mode = "display"):
         # 新的迷宫数据
-        self.m = copy.deepcopy(maze_map)
+        self.m = maze_map.snapshot()
         self.answer = answer if answer is not None else []
         self.col_num = maze_map.size[1] # 列 -> 二维
         self.row_num = maze_map.size[0]
         self.callback = callback
-        self.diff = None
-        self.pix = None
+        self.pix = None # 离屏的后备缓存，整个迷宫画在其上，窗口只从中拷贝需要刷新的区域
         self.mode = mode
         self.repaint() # 强制刷新迷宫
 
@@ -310,49 +477,96 @@ class MazeWidget(QtWidgets.QWidget):
         if self.m is None or self.m.size != maze_map.size:
             self.new_maze(maze_map) # 首次设置
         else:
-            self.diff = self.m.diff(maze_map)
-            self.m = copy.deepcopy(maze_map)
-            self.pix = self.grab(QtCore.QRect(0, 0, self.width(), self.height())) # 避免仅显示绘制部分，作为二级缓存显示
+            diff = self.m.diff(maze_map)
+            self.m = maze_map.snapshot()
+            self._clear_answer()
+            self._draw_cells(diff)
+
+    def apply_changes(self, changes):
+        # 直接应用算法发出的增量修改 [(行, 列, 值), ...]，不需要复制和比较整个地图
+        if self.m is None:
+            return
+        for n, m, v in changes:
+            self.m.data[n][m] = v
+        self._clear_answer()
+        self._draw_cells(changes)
+
+    def _clear_answer(self):
+        if self.answer:
             self.answer = []
-            self.repaint()
+            self.pix = None # 答案画在后备缓存上，需要整体重绘
+
+    def _cell_rect(self, n, m):
+        return QtCore.QRect(ceil(m * self.col_len), ceil(n * self.row_len), ceil(self.col_len), ceil(self.row_len))
+
+    def _dirty_rect(self, n, m):
+        # 包含格子在缩放图像中的像素及其上图标的矩形，向外多留 1 像素
+        return QtCore.QRect(int(m * self.col_len) - 1, int(n * self.row_len) - 1, ceil(self.col_len) + 2, ceil(self.row_len) + 2)
+
+    def _draw_cells(self, changes):
+        # 只重绘修改的格子: 更新每格一个像素的图像，在这些格子的外接矩形内按与整体重建相同的缩放重画，
+        # 格子边界与整体重建完全一致；之后只刷新这个矩形
+        if self.pix is None: # 还没有后备缓存，下次绘制时整体重建
+            self.update()
+            return
+        dirty = QtCore.QRect()
+        for n, m, v in changes:
+            self.image.setPixel(m, n, v)
+            dirty = dirty.united(self._dirty_rect(n, m))
+        dirty = dirty.intersected(self.pix.rect())
+        if dirty.isEmpty():
+            return
+        painter = QtGui.QPainter(self.pix)
+        painter.setClipRect(dirty)
+        self._draw_all(painter)
+        self._draw_answer(painter)
+        painter.end()
+        self.update(dirty)
+
+    def _rebuild(self):
+        # 重建整个后备缓存，只在新迷宫、窗口尺寸变化或清除答案时发生
+        self.col_len = self.width() / self.col_num
+        self.row_len = self.height() / self.row_num
+        self.pix = QtGui.QPixmap(self.size())
+        self.image = self._cell_image()
+        painter = QtGui.QPainter(self.pix)
+        self._draw_all(painter)
+        self._draw_answer(painter)
+        painter.end()
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self.pix = None
 
     def get_map(self):
-        return copy.deepcopy(self.m)
+        return self.m.snapshot()
 
     def paintEvent(self, e):
         super().paintEvent(e)
+        if self.pix is None or self.pix.size() != self.size():
+            self._rebuild()
         painter = QtGui.QPainter(self)
-        self.col_len = self.width() / self.col_num
-        self.row_len = self.height() / self.row_num
-        if self.diff and self.pix:
-            painter.drawPixmap(0, 0, self.width(), self.height(), self.pix)
-            self._draw_diff(painter)
-        else:
-            self._draw_all(painter)
-            self._draw_answer(painter)
+        painter.drawPixmap(e.rect(), self.pix, e.rect()) # 只拷贝需要刷新的区域
+
+    @classmethod
+    def _icon(cls, value):
+        if value not in cls._icon_cache:
+            cls._icon_cache[value] = QtGui.QImage(os.path.sep.join([_script_dir, "resources", cls.Icons[value]]))
+        return cls._icon_cache[value]
+
+    def _cell_image(self):
+        # 每个格子一个像素的 Indexed8 图像，像素即网格的原始字节，颜色由调色板查表
+        raw = self.m.data.tobytes()
+        image = QtGui.QImage(raw, self.col_num, self.row_num, self.col_num, QtGui.QImage.Format_Indexed8)
+        image.setColorTable(self.Palette)
+        return image.copy() # 不再引用 raw
 
     def _draw_all(self, painter):
-        # 绘制迷宫
-        for m in range(self.col_num):
-            for n in range(self.row_num):
-                color = self.ColorMap[self.m.data[n][m]] if self.m.data[n][m] in self.ColorMap.keys() else QtCore.Qt.white
-                painter.setPen(color)
-                painter.setBrush(color)
-                painter.drawRect(ceil(m * self.col_len), ceil(n * self.row_len), ceil(self.col_len), ceil(self.row_len))
-                if self.m.data[n][m] == Point.Start:
-                    painter.drawImage(QtCore.QRect(ceil(m * self.col_len), ceil(n * self.row_len), ceil(self.col_len), ceil(self.row_len)), 
-                        QtGui.QImage(os.path.sep.join([_script_dir, "resources", "run.png"])))
-                if self.m.data[n][m] == Point.End:
-                    painter.drawImage(QtCore.QRect(ceil(m * self.col_len), ceil(n * self.row_len), ceil(self.col_len), ceil(self.row_len)), 
-                        QtGui.QImage(os.path.sep.join([_script_dir, "resources", "flag.png"])))
-
-    def _draw_diff(self, painter):
-        # 绘制增量 - 提升刷新性能
-        for n, m, v in self.diff:
-            color = self.ColorMap[v] if v in self.ColorMap.keys() else QtCore.Qt.white
-            painter.setPen(color)
-            painter.setBrush(color)
-            painter.drawRect(ceil(m * self.col_len), ceil(n * self.row_len), ceil(self.col_len), ceil(self.row_len))
+        # 绘制迷宫: 整个网格的图像一次缩放绘制(不开启平滑，每个格子保持纯色)，再在起止点上绘制图标
+        painter.drawImage(QtCore.QRect(0, 0, self.width(), self.height()), self.image)
+        for value in self.Icons:
+            for n, m in self.m.data.positions(value):
+                painter.drawImage(self._cell_rect(n, m), self._icon(value))
 
     def _draw_answer(self, painter):
         # 绘制答案
@@ -392,9 +606,11 @@ class MazeWidget(QtWidgets.QWidget):
             self.m.data[row][col] = Point.Chan
         elif self.m.data[row][col] == Point.Chan and btn == QtCore.Qt.RightButton:
             self.m.data[row][col] = Point.Wall
-        self.repaint() # 强制刷新迷宫
+        else:
+            return # 没有翻转，不需要刷新和检查
+        self._draw_cells([(row, col, self.m.data[row][col])])
         if self.callback:
-            self.callback(self.m)
+            self.callback(self.m, (row, col))
         
     def _flip_cell_for_run_maze(self, pos, btn):
         # 获取坐标所在迷宫位置并标记已访问，注意此处QT的坐标和矩阵是反的
@@ -414,7 +630,7 @@ class MazeWidget(QtWidgets.QWidget):
             self.m.data[row][col] = Point.Visited
         elif self.m.data[row][col] == Point.Visited and btn == QtCore.Qt.RightButton:
             self.m.data[row][col] = Point.Chan
-        self.repaint() # 强制刷新迷宫
+        self._draw_cells([(row, col, self.m.data[row][col])])
         if self.callback:
             self.callback(self.m)
 